@@ -3,57 +3,115 @@
 """
 FeedbackHandler class for managing agent feedback and user input.
 """
+import logging
+from collections import deque
+from ..utils.logger import Logger
+
+# Shared by every handler instance, like system_interaction_logger
+_LOGGER = Logger()
 
 class FeedbackHandler:
     """Handles feedback queue and user input for the agent."""
-    def __init__(self):
-        from ..utils.logger import Logger
-        self.logger = Logger()
-        self.feedback_queue = []
+    def __init__(self, max_pending: int = 1024):
+        self.logger = _LOGGER
+        # Bounded so a fast producer cannot grow memory without limit; the oldest items are dropped first
+        self.feedback_queue = deque(maxlen=max_pending)
 
     def receive_feedback(self, feedback: str):
         """Receives feedback from an external source (e.g., user, system)."""
+        if len(self.feedback_queue) == self.feedback_queue.maxlen:
+            self.logger.warning("Feedback queue full, dropping oldest feedback.")
         self.feedback_queue.append(feedback)
-        self.logger.info(f"Feedback received: {feedback}")
+        # Per-item records are debug-only so a fast producer does not pay for a log write per item
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug("Feedback received: %s", feedback)
+
+    def receive_feedback_many(self, items: list[str]):
+        """Receives a batch of feedback items with a single enqueue and log record."""
+        overflow = len(self.feedback_queue) + len(items) - self.feedback_queue.maxlen
+        if overflow > 0:
+            self.logger.warning("Feedback queue full, dropping %d oldest feedback items.", overflow)
+        self.feedback_queue.extend(items)
+        self.logger.info("Feedback batch received: %d items", len(items))
 
     def get_latest_feedback(self) -> str | None:
         """Retrieves and clears the latest feedback."""
-        if self.feedback_queue:
-            return self.feedback_queue.pop(0) # FIFO
-        return None
+        # append/popleft are atomic on a deque, so the web thread can push feedback
+        # while the agent thread consumes it without an explicit lock.
+        try:
+            return self.feedback_queue.popleft() # FIFO
+        except IndexError:
+            return None
 
     def get_all_feedback(self) -> list[str]:
         """Retrieves and clears all pending feedback."""
-        feedback = list(self.feedback_queue)
-        self.feedback_queue.clear()
-        return feedback
+        feedback = []
+        while True:
+            try:
+                feedback.append(self.feedback_queue.popleft())
+            except IndexError:
+                return feedback
 
     def process_feedback(self, agent_state: dict, feedback: str) -> dict:
         """Processes feedback and updates the agent's internal state or understanding."""
-        self.logger.info(f"Processing feedback: '{feedback}' for agent state.")
+        self.logger.info("Processing feedback: '%s' for agent state.", feedback)
         agent_state["last_feedback"] = feedback
         return agent_state
 
-    '''def ask_user_for_input(self, question: str) -> str:
+    def ask_user_for_input(self, question: str, timeout: float = 300.0) -> str:
         """Web-compatible: writes question to pending_question.txt and waits for answer in pending_answer.txt."""
-        import os, time
+        import os, threading, time
+        from watchdog.observers import Observer
+        from watchdog.events import FileSystemEventHandler
         pending_question_path = os.path.join(os.path.dirname(__file__), "..", "..", "pending_question.txt")
-        pending_answer_path = os.path.join(os.path.dirname(__file__), "..", "..", "pending_answer.txt")
-        # Write the question
-        with open(pending_question_path, "w", encoding="utf-8") as f:
-            f.write(question)
-        self.logger.info(f"Agent asked user: {question}")
-        # Wait for answer (poll every second, timeout after 5 minutes)
-        for _ in range(300):
-            if os.path.exists(pending_answer_path):
-                with open(pending_answer_path, "r", encoding="utf-8") as f:
-                    answer = f.read().strip()
-                os.remove(pending_answer_path)
-                self.logger.info(f"User answered: {answer}")
-                return answer
-            time.sleep(1)
+        pending_answer_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "pending_answer.txt"))
+        answer_ready = threading.Event()
+        write_finished = threading.Event()
+
+        class _AnswerWatcher(FileSystemEventHandler):
+            def on_any_event(self, event):
+                if event.event_type not in ("created", "modified", "closed", "moved"):
+                    return
+                paths = (event.src_path, getattr(event, "dest_path", ""))
+                if pending_answer_path in (os.path.abspath(p) for p in paths if p):
+                    if event.event_type in ("closed", "moved"):
+                        # Closed after writing (inotify only) or renamed into place: the content is final
+                        write_finished.set()
+                    answer_ready.set()
+
+        # Watch for the answer file instead of polling for it (inotify/FSEvents/ReadDirectoryChangesW)
+        observer = Observer()
+        observer.schedule(_AnswerWatcher(), os.path.dirname(pending_answer_path), recursive=False)
+        observer.start()
+        try:
+            # Write the question
+            with open(pending_question_path, "w", encoding="utf-8") as f:
+                f.write(question)
+            self.logger.info("Agent asked user: %s", question)
+            deadline = time.monotonic() + timeout
+            # The answer may already exist if it was written before the observer started
+            ready = os.path.exists(pending_answer_path)
+            while ready or answer_ready.wait(max(0.0, deadline - time.monotonic())):
+                answer_ready.clear()
+                finished = write_finished.is_set()
+                write_finished.clear()
+                try:
+                    with open(pending_answer_path, "r", encoding="utf-8") as f:
+                        answer = f.read().strip()
+                except FileNotFoundError:
+                    ready = False
+                    continue
+                # Created/modified events can arrive before any content is written; an empty file only counts once finished
+                if answer or finished:
+                    os.remove(pending_answer_path)
+                    self.logger.info("User answered: %s", answer)
+                    return answer
+                ready = False
+        finally:
+            observer.stop()
+            observer.join()
         self.logger.error("Timed out waiting for user answer.")
-        return ""'''
+        return ""
 
 # Example Usage
 if __name__ == "__main__":
@@ -2,68 +2,114 @@
 SystemInteraction class for automating system-level actions (mouse, keyboard, shell, etc.).
 """
 
-import pyautogui
 import time
+import asyncio
 import subprocess
 from ..utils.logger import Logger
 from ..utils.window_utils import focus_window
-from ..utils.platform_utils import is_windows, is_mac, is_linux
+from ..utils.platform_utils import is_windows, is_mac, is_linux, get_pyautogui as _pg
+
+# The platform cannot change at runtime, so resolve it once at import
+_IS_WINDOWS = is_windows()
+
+system_interaction_logger = Logger()
 
 class SystemInteraction:
     """Automates system-level actions for the agent."""
+    logger = system_interaction_logger
+
     def __init__(self):
-        pyautogui.FAILSAFE = True
-        self.logger = Logger()
+        self.logger = system_interaction_logger
+        self._shell = _IS_WINDOWS
 
     def move_mouse(self, x: int, y: int, duration: float = 0.5):
         """Moves the mouse cursor to absolute coordinates."""
-        print(f"Moving mouse to ({x}, {y})")
-        pyautogui.moveTo(x, y, duration=duration)
+        self.logger.debug("Moving mouse to (%s, %s)", x, y)
+        _pg().moveTo(x, y, duration=duration)
 
     def click(self, x: int = None, y: int = None, button: str = 'left'):
         """Performs a mouse click at current position or specified coordinates."""
         if x is not None and y is not None:
-            print(f"Clicking at ({x}, {y}) with {button} button")
-            pyautogui.click(x=x, y=y, button=button)
+            self.logger.debug("Clicking at (%s, %s) with %s button", x, y, button)
+            _pg().click(x=x, y=y, button=button)
         else:
-            print(f"Clicking at current position with {button} button")
-            pyautogui.click(button=button)
+            self.logger.debug("Clicking at current position with %s button", button)
+            _pg().click(button=button)
 
     def type_text(self, text: str, interval: float = 0.05):
         """Types out a string of text."""
-        print(f"Typing text: '{text}'")
-        pyautogui.write(text, interval=interval)
+        self.logger.debug("Typing text: '%s'", text)
+        _pg().write(text, interval=interval)
 
     def press_key(self, key: str):
         """Presses a single key."""
-        print(f"Pressing key: '{key}'")
-        pyautogui.press(key)
+        self.logger.debug("Pressing key: '%s'", key)
+        _pg().press(key)
 
     def hotkey(self, *args):
         """Presses a combination of keys (e.g., 'ctrl', 'c')."""
-        print(f"Pressing hotkey: {args}")
-        pyautogui.hotkey(*args)
+        self.logger.debug("Pressing hotkey: %s", args)
+        _pg().hotkey(*args)
 
-    def execute_shell_command(self, command: str, background: bool = False) -> tuple[int, str, str]:
-        """Executes a shell command. If background=True, runs non-blocking and returns immediately. Platform-aware."""
-        self.logger.info(f"Executing shell command: '{command}' (background={background})")
-        shell = is_windows()
+    def execute_shell_command(self, command: str | list[str], background: bool = False, cwd: str | None = None, timeout: float | None = None) -> tuple[int, str, str]:
+        """Executes a shell command. If background=True, runs non-blocking and returns immediately. Platform-aware.
+
+        Prefer the list form (e.g. ["git", "status"]): it is executed directly without spawning a shell.
+        cwd sets the working directory; timeout (seconds) only applies to foreground commands.
+        """
+        self.logger.info("Executing shell command: '%s' (background=%s)", command, background)
+        shell = False if isinstance(command, list) else self._shell
         try:
             if background:
-                process = subprocess.Popen(command, shell=shell)
-                self.logger.info(f"Started background process PID={process.pid}")
+                process = subprocess.Popen(command, shell=shell, cwd=cwd)
+                self.logger.info("Started background process PID=%s", process.pid)
                 return 0, f"Started background process PID={process.pid}", ""
             else:
-                process = subprocess.run(command, shell=shell, capture_output=True, text=True, check=False)
-                self.logger.info(f"Command '{command}' executed. Stdout: {process.stdout.strip()}")
+                process = subprocess.run(command, shell=shell, cwd=cwd, timeout=timeout, capture_output=True, text=True, check=False)
+                self.logger.info("Command '%s' executed. Stdout: %s", command, process.stdout.strip())
                 return process.returncode, process.stdout, process.stderr
         except Exception as e:
-            self.logger.error(f"Error executing shell command '{command}': {e}", exc_info=True)
+            self.logger.error("Error executing shell command '%s': %s", command, e, exc_info=True)
+            return 1, "", str(e)
+
+    async def execute_shell_command_async(self, command: str | list[str], background: bool = False, cwd: str | None = None, timeout: float | None = None) -> tuple[int, str, str]:
+        """Async variant of execute_shell_command, so several commands can be awaited together with asyncio.gather.
+
+        The child is killed if it outlives timeout or the awaiting task is cancelled.
+        """
+        if background:
+            # Popen already returns immediately; there is nothing to await
+            return self.execute_shell_command(command, background=True, cwd=cwd)
+        self.logger.info("Executing shell command (async): '%s'", command)
+        pipes = {"stdout": asyncio.subprocess.PIPE, "stderr": asyncio.subprocess.PIPE, "cwd": cwd}
+        try:
+            if isinstance(command, list):
+                process = await asyncio.create_subprocess_exec(*command, **pipes)
+            elif self._shell:
+                process = await asyncio.create_subprocess_shell(command, **pipes)
+            else:
+                process = await asyncio.create_subprocess_exec(command, **pipes)
+            try:
+                stdout, stderr = await asyncio.wait_for(process.communicate(), timeout)
+            except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+                # Nobody will read the output any more, so do not leave the child running
+                if process.returncode is None:
+                    process.kill()
+                    await process.wait()
+                if isinstance(e, asyncio.CancelledError):
+                    raise
+                raise subprocess.TimeoutExpired(command, timeout) from None
+            stdout = stdout.decode(errors="replace")
+            stderr = stderr.decode(errors="replace")
+            self.logger.info("Command '%s' executed. Stdout: %s", command, stdout.strip())
+            return process.returncode, stdout, stderr
+        except Exception as e:
+            self.logger.error("Error executing shell command '%s': %s", command, e, exc_info=True)
             return 1, "", str(e)
 
     def focus_window(self, title_substring: str, timeout: float = 5.0) -> bool:
         """Focuses a window whose title contains the given substring. Only works on Windows."""
-        if not is_windows():
+        if not _IS_WINDOWS:
             self.logger.warning("Window focusing is only supported on Windows.")
             return False
         return focus_window(title_substring, timeout)
@@ -107,9 +153,6 @@ class SystemInteraction:
     #         self.driver.quit()
     #         print("Browser closed.")
 
-system_interaction_logger = Logger()
-SystemInteraction.logger = system_interaction_logger
-
 # Example Usage (for testing)
 if __name__ == "__main__":
     sys_interact = SystemInteraction()
@@ -1,15 +1,136 @@
 import os
+import time
+import importlib.util
+import threading
+from collections import OrderedDict
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from bs4 import BeautifulSoup
 import logging
+from concurrent.futures import ThreadPoolExecutor
+try:
+    from selectolax.parser import HTMLParser  # C-backed parser, much faster than html.parser
+except ImportError:
+    HTMLParser = None
+# Tree builder for the BeautifulSoup fallback, resolved once instead of on every page
+_BS4_FEATURES = "lxml" if importlib.util.find_spec("lxml") is not None else "html.parser"
 
-def web_search(query: str, num_results: int = 3) -> str:
-    """Performs a web search using Google Custom Search API and summarizes the top result's main content."""
+# Shared session so the CSE API and result pages reuse pooled keep-alive connections
+_SESSION = requests.Session()
+_SESSION.headers.update({"User-Agent": "Mozilla/5.0"})
+_ADAPTER = HTTPAdapter(
+    pool_connections=10,
+    pool_maxsize=10,
+    max_retries=Retry(total=2, backoff_factor=0.3, status_forcelist=(429, 500, 502, 503, 504), allowed_methods=("GET",)),
+)
+_SESSION.mount("https://", _ADAPTER)
+_SESSION.mount("http://", _ADAPTER)
+# Fetches result pages in parallel so fallbacks do not cost another round trip
+_FETCH_POOL = ThreadPoolExecutor(max_workers=4, thread_name_prefix="web_search")
+# Only the first 1000 chars of readable text are returned, so stop downloading long pages early
+_MAX_PAGE_CHARS = 200_000
+# Paragraphs need more than 40 chars of text; "<p></p>" adds 7 chars of markup, so shorter raw HTML cannot qualify
+_MIN_PARAGRAPH_TEXT = 40
+_MIN_PARAGRAPH_HTML = _MIN_PARAGRAPH_TEXT + len("<p></p>") + 1
+# Combined CSE snippets at least this long are returned without fetching any page
+_MIN_SNIPPET_SUMMARY = 200
+# Start of the messages web_search returns in place of search content
+_FAILURE_PREFIXES = ("Google Custom Search API key or CSE ID not set", "No web results found.", "No readable content found.", "Web search failed:")
+# LRU cache of recent summaries keyed by (query, num_results, deep): value is (timestamp, summary)
+_CACHE: "OrderedDict[tuple[str, int, bool], tuple[float, str]]" = OrderedDict()
+_CACHE_TTL = 600.0
+_CACHE_MAX_ENTRIES = 256
+_CACHE_LOCK = threading.Lock()
+# Validators of fetched pages keyed by URL: value is (etag, last_modified, extracted text)
+_PAGE_CACHE: "OrderedDict[str, tuple[str | None, str | None, str]]" = OrderedDict()
+
+def _cache_get(key: tuple[str, int, bool]) -> str | None:
+    with _CACHE_LOCK:
+        entry = _CACHE.get(key)
+        if entry is None:
+            return None
+        if time.monotonic() - entry[0] >= _CACHE_TTL:
+            del _CACHE[key]
+            return None
+        _CACHE.move_to_end(key)
+        return entry[1]
+
+def _cache_put(key: tuple[str, int, bool], summary: str):
+    with _CACHE_LOCK:
+        _CACHE[key] = (time.monotonic(), summary)
+        _CACHE.move_to_end(key)
+        while len(_CACHE) > _CACHE_MAX_ENTRIES:
+            _CACHE.popitem(last=False)
+
+def _fetch_page_text(url: str) -> str:
+    """Fetches a result page and extracts its readable paragraph text, revalidating previously seen pages."""
+    with _CACHE_LOCK:
+        cached = _PAGE_CACHE.get(url)
+    headers = {}
+    if cached is not None:
+        etag, last_modified, _ = cached
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+    with _SESSION.get(url, timeout=10, stream=True, headers=headers) as page:
+        if page.status_code == 304 and cached is not None:
+            return cached[2]
+        page.raise_for_status()
+        page.encoding = page.encoding or "utf-8"
+        chunks, size = [], 0
+        for chunk in page.iter_content(chunk_size=16384, decode_unicode=True):
+            chunks.append(chunk)
+            size += len(chunk)
+            if size >= _MAX_PAGE_CHARS:
+                break
+        etag, last_modified = page.headers.get("ETag"), page.headers.get("Last-Modified")
+    text = _extract_text(''.join(chunks))
+    if text and (etag or last_modified):
+        with _CACHE_LOCK:
+            _PAGE_CACHE[url] = (etag, last_modified, text)
+            _PAGE_CACHE.move_to_end(url)
+            while len(_PAGE_CACHE) > _CACHE_MAX_ENTRIES:
+                _PAGE_CACHE.popitem(last=False)
+    return text
+
+def _extract_text(html: str) -> str:
+    """Extracts readable paragraph text from an HTML document."""
+    if HTMLParser is not None:
+        tree = HTMLParser(html)
+        paragraphs = (node.text() for node in tree.css('p') if len(node.html or "") >= _MIN_PARAGRAPH_HTML)
+        text = '\n'.join(p for p in paragraphs if len(p) > _MIN_PARAGRAPH_TEXT)
+        if not text:
+            text = tree.body.text() if tree.body is not None else tree.text()
+        return text
+    soup = BeautifulSoup(html, _BS4_FEATURES)
+    paragraphs = (p.get_text() for p in soup.find_all('p'))
+    text = '\n'.join(p for p in paragraphs if len(p) > _MIN_PARAGRAPH_TEXT)
+    if not text:
+        text = soup.get_text()
+    return text
+
+def is_failed_result(result: str) -> bool:
+    """Whether a web_search result reports a failure or an empty search rather than content."""
+    return result.startswith(_FAILURE_PREFIXES)
+
+def web_search(query: str, num_results: int = 3, deep: bool = False) -> str:
+    """Performs a web search using Google Custom Search API and summarizes the results.
+
+    The result snippets returned by the API are used when they are informative enough; with deep=True
+    (or when the snippets are too short) the main content of the top readable result page is fetched instead.
+    """
     logger = logging.getLogger("WebSearchTool")
     api_key = os.environ.get("GOOGLE_CSE_API_KEY")
     cse_id = os.environ.get("GOOGLE_CSE_ID")
     if not api_key or not cse_id:
         return "Google Custom Search API key or CSE ID not set. Please set GOOGLE_CSE_API_KEY and GOOGLE_CSE_ID in your environment."
+    cache_key = (query, num_results, deep)
+    cached = _cache_get(cache_key)
+    if cached is not None:
+        logger.info("[Google CSE] Cache hit for '%s'.", query)
+        return cached
     search_url = "https://www.googleapis.com/customsearch/v1"
     params = {
         "key": api_key,
@@ -18,27 +139,44 @@ def web_search(query: str, num_results: int = 3) -> str:
         "num": num_results
     }
     try:
-        resp = requests.get(search_url, params=params, timeout=10)
+        resp = _SESSION.get(search_url, params=params, timeout=10)
         resp.raise_for_status()
         data = resp.json()
         items = data.get("items", [])
         if not items:
-            logger.warning(f"[Google CSE] No results found for '{query}'.")
+            logger.warning("[Google CSE] No results found for '%s'.", query)
             return "No web results found."
-        url = items[0]["link"]
-        logger.info(f"[Google CSE] Top result for '{query}': {url}")
-        # Fetch and summarize the main content from the first result
-        page = requests.get(url, timeout=10, headers={"User-Agent": "Mozilla/5.0"})
-        page.raise_for_status()
-        soup = BeautifulSoup(page.text, "html.parser")
-        paragraphs = soup.find_all('p')
-        text = '\n'.join(p.get_text() for p in paragraphs if len(p.get_text()) > 40)
-        if not text:
-            text = soup.get_text()
+        top_items = items[:max(num_results, 1)]
+        if not deep:
+            snippets = '\n'.join(snippet for snippet in (item.get("snippet", "").strip() for item in top_items) if snippet)
+            if len(snippets) >= _MIN_SNIPPET_SUMMARY:
+                summary = snippets[:1000]
+                _cache_put(cache_key, summary)
+                return summary
+        urls = [item["link"] for item in top_items]
+        logger.info("[Google CSE] Top result for '%s': %s", query, urls[0])
+        # Fetch the top results concurrently and summarize the best-ranked one with readable content
+        futures = [_FETCH_POOL.submit(_fetch_page_text, url) for url in urls]
+        text, first_error = "", None
+        for url, future in zip(urls, futures):
+            try:
+                text = future.result()
+            except Exception as e:
+                logger.warning("[Google CSE] Failed to fetch '%s': %s", url, e)
+                first_error = first_error or e
+                continue
+            if text:
+                break
+        for future in futures:
+            future.cancel()
+        if not text and first_error is not None:
+            raise first_error
         summary = text[:1000] if text else "No readable content found."
+        if not is_failed_result(summary):
+            _cache_put(cache_key, summary)  # Unreadable pages are often transient fetch failures; retry them next time
         return summary
     except Exception as e:
-        logger.error(f"[Google CSE] Search or content extraction failed for '{query}': {e}")
+        logger.error("[Google CSE] Search or content extraction failed for '%s': %s", query, e)
         return f"Web search failed: {e}"
 
 """
@@ -1,18 +1,100 @@
 """
 ActionExecutor class for executing actions decided by the LLM.
 """
+import asyncio
 import time
 import os
-import base64
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from ..utils.file_search import find_video_files_by_keyword_recursive
 from ..utils.window_utils import list_open_windows, is_window_open, list_processes, is_process_running
+try:
+    from ..action.web_search import web_search as _WEB_SEARCH, is_failed_result as _is_failed_search
+except ImportError:
+    _WEB_SEARCH = _is_failed_search = None
+
+# Upper bound on concurrently running commands in a batch_shell action
+MAX_BATCH_SHELL_WORKERS = 8
+
+# Actions that only observe the system; consecutive runs of them may execute concurrently
+READ_ONLY_ACTIONS = frozenset({"read_file", "list_directory", "capture_screen", "web_search"})
+MAX_PARALLEL_ACTIONS = 4
+
+# How long window/process enumerations attached to feedback may be reused, in seconds
+ENUM_CACHE_TTL = float(os.environ.get("AGENT_ENUM_TTL", "1.0"))
+
+# How long to wait for a background enumeration before reporting the last known value, in seconds
+ENUM_RESULT_TIMEOUT = 2.0
+
+# read_file/list_directory results are reused for this long, in seconds, unless a non-read-only action runs in between
+READ_CACHE_TTL = float(os.environ.get("AGENT_READ_CACHE_TTL", "5.0"))
+READ_CACHE_SIZE = 128
+
+class _CachedEnum:
+    """Caches the result of an expensive OS enumeration for a short TTL."""
+    def __init__(self, func, ttl: float = ENUM_CACHE_TTL):
+        self.func = func
+        self.ttl = ttl
+        self._entry = None  # (timestamp, value)
+        self._pending = None  # Future of an in-flight background refresh
+
+    def _is_stale(self) -> bool:
+        return self._entry is None or time.monotonic() - self._entry[0] > self.ttl
+
+    def prefetch(self, executor):
+        """Starts a background refresh if the cached value is stale, so a later get() does not block on it."""
+        if self._pending is None and self._is_stale():
+            self._pending = executor.submit(self.func)
+
+    def get(self, timeout: float = ENUM_RESULT_TIMEOUT):
+        pending = self._pending
+        if pending is not None:
+            if self._entry is None:
+                value = pending.result()  # Nothing to fall back on yet
+            else:
+                try:
+                    value = pending.result(timeout=timeout)
+                except FutureTimeoutError:
+                    # Still running; report the last known value and leave the refresh in flight
+                    return self._entry[1]
+            self._pending = None
+            self._entry = (time.monotonic(), value)
+        elif self._is_stale():
+            self._entry = (time.monotonic(), self.func())
+        return self._entry[1]
+
+    def mark_stale(self):
+        """Makes the next prefetch/get re-enumerate, keeping the current value as the fallback for a slow refresh."""
+        self._pending = None  # An in-flight refresh started before the change
+        if self._entry is not None:
+            self._entry = (float("-inf"), self._entry[1])
+
+# Longest command output echoed back in feedback; larger outputs keep only their tail
+MAX_OUTPUT_CHARS = 4096
+
+def _output_tail(text):
+    """Strips command output, copying at most MAX_OUTPUT_CHARS of it regardless of its size."""
+    if not isinstance(text, str):
+        return text
+    if len(text) <= MAX_OUTPUT_CHARS:
+        return text.strip()
+    return "..." + text[-MAX_OUTPUT_CHARS:].rstrip()
+
+@lru_cache(maxsize=32)
+def _split_hotkey(keys: str) -> tuple:
+    """Splits a 'ctrl+c' style hotkey string; the LLM tends to repeat the same few combinations."""
+    return tuple(keys.split('+'))
 
 class ActionExecutor:
     # Define allowed actions
-    ALLOWED_ACTIONS = {
+    ALLOWED_ACTIONS = frozenset({
         "read_file",
         "write_file",
         "execute_shell_command",
+        "batch_shell",
+        "batch",
         "focus_window",
         "list_directory",
         "capture_screen",
@@ -25,7 +107,7 @@ class ActionExecutor:
         "click",
         #"ask_user",
         "web_search"  # <-- Add web_search
-    }
+    })
 
     def __init__(self, file_io, screen_capture, system_interaction, logger, agent_state):
         self.file_io = file_io
@@ -33,167 +115,349 @@ class ActionExecutor:
         self.system_interaction = system_interaction
         self.logger = logger
         self.agent_state = agent_state
-        try:
-            from ..action.web_search import web_search as web_search_tool
-            self.web_search_tool = web_search_tool
-        except ImportError:
-            self.web_search_tool = None
+        self.web_search_tool = _WEB_SEARCH
+        self._allowed_sorted = sorted(self.ALLOWED_ACTIONS)
+        # Raw bytes of the latest capture_screen, kept out of the JSON-serialized agent_state
+        self.last_screenshot_bytes = None
+        self._windows_cache = _CachedEnum(list_open_windows)
+        self._processes_cache = _CachedEnum(list_processes)
+        # Runs window/process enumerations alongside the action that reports them
+        self._bg = ThreadPoolExecutor(max_workers=2, thread_name_prefix="enum")
+        # Dispatch table: one hashed lookup instead of a linear if/elif chain over action names
+        self._handlers = {action: getattr(self, f"_do_{action}") for action in self.ALLOWED_ACTIONS}
+        # LRU of (action, path, mtime, size) -> (timestamp, result) for repeated reads; cleared by any action that may change state
+        self._read_cache = OrderedDict()
+        self._read_cache_lock = threading.Lock()
 
     def execute_action(self, parsed_action: dict) -> dict:
-        action_type = parsed_action.get("action", "").strip().lower()
-        if action_type not in self.ALLOWED_ACTIONS:
-            self.logger.warning(f"Action '{action_type}' is not in the allowed set: {self.ALLOWED_ACTIONS}")
+        action_type = parsed_action.get("action", "")
+        handler = self._handlers.get(action_type)
+        if handler is None:
+            # Only normalize when the LLM did not already emit a canonical name
+            action_type = action_type.strip().lower()
+            handler = self._handlers.get(action_type)
+        if handler is None:
+            self.logger.warning("Action '%s' is not in the allowed set: %s", action_type, self.ALLOWED_ACTIONS)
             return {
                 "status": "failure",
-                "message": f"Action '{action_type}' is not allowed. Allowed actions: {sorted(self.ALLOWED_ACTIONS)}",
+                "message": f"Action '{action_type}' is not allowed. Allowed actions: {self._allowed_sorted}",
                 "details": {}
             }
-        self.logger.info(f"Executing action type: {action_type}")
+        self.logger.info("Executing action type: %s", action_type)
+        if action_type not in READ_ONLY_ACTIONS and self._read_cache:
+            with self._read_cache_lock:
+                self._read_cache.clear()
         feedback = {"status": "success", "message": "Action executed successfully.", "details": {}}
         action_entry = {"timestamp": time.time(), "action": parsed_action}
         self.agent_state["history"].append(action_entry)
         try:
-            if action_type == "read_file":
-                filename = parsed_action.get("file")
-                content = self.file_io.read_file(filename)
-                self.agent_state["last_read_content"] = content
-                feedback["details"]["filename"] = filename
-                feedback["details"]["content_preview"] = content[:200] + "..." if content else "No content"
-                if not content:
-                    feedback["status"] = "failure"
-                    feedback["message"] = f"File read failed or file is empty for {filename}."
-            elif action_type == "write_file":
-                filename = parsed_action.get("file")
-                content = parsed_action.get("content")
-                if self.file_io.write_file(filename, content):
-                    feedback["details"]["filename"] = filename
-                    feedback["details"]["content_written_preview"] = content[:100] + "..."
-                else:
-                    feedback["status"] = "failure"
-                    feedback["message"] = f"Failed to write to {filename}."
-            elif action_type == "execute_shell_command":
-                command = parsed_action.get("command")
-                background = parsed_action.get("background", False)
-                if command:
-                    return_code, stdout, stderr = self.system_interaction.execute_shell_command(command, background=background)
-                    feedback["details"]["command"] = command
-                    feedback["details"]["background"] = background
-                    feedback["details"]["return_code"] = return_code
-                    feedback["details"]["stdout"] = stdout.strip() if isinstance(stdout, str) else stdout
-                    feedback["details"]["stderr"] = stderr.strip() if isinstance(stderr, str) else stderr
-                    # Add generic process/window info
-                    feedback["details"]["open_windows"] = list_open_windows()
-                    feedback["details"]["processes"] = list_processes()
-                    if return_code == 0:
-                        feedback["message"] = f"Command '{command}' executed successfully." if not background else f"Command '{command}' started in background."
-                    else:
-                        feedback["status"] = "failure"
-                        feedback["message"] = f"Command '{command}' failed (Exit Code: {return_code})."
-                else:
-                    feedback["status"] = "failure"
-                    feedback["message"] = "execute_shell_command action missing 'command' parameter."
-                    self.logger.warning(feedback["message"])
-            elif action_type == "focus_window":
-                title_substring = parsed_action.get("title_substring")
-                if title_substring:
-                    success = self.system_interaction.focus_window(title_substring)
-                    feedback["details"]["title_substring"] = title_substring
-                    feedback["details"]["focused"] = success
-                    feedback["details"]["open_windows"] = list_open_windows()
-                    if success:
-                        feedback["message"] = f"Focused window with title containing '{title_substring}'."
-                    else:
-                        feedback["status"] = "failure"
-                        feedback["message"] = f"Could not find or focus window with title containing '{title_substring}'."
-                else:
-                    feedback["status"] = "failure"
-                    feedback["message"] = "focus_window action missing 'title_substring' parameter."
-                    self.logger.warning(feedback["message"])
-            elif action_type == "list_directory":
-                path = parsed_action.get("path", ".")
-                contents = self.file_io.list_directory(path)
-                self.agent_state["last_directory_list"] = contents
-                feedback["details"]["path"] = path
-                feedback["details"]["contents"] = contents
-                if contents is None:
-                    feedback["status"] = "failure"
-                    feedback["message"] = "Directory listing failed."
-            elif action_type == "capture_screen":
-                filename = parsed_action.get("file")
-                screenshot_bytes = self.screen_capture.capture_screen_bytes(filename)
-                if screenshot_bytes:
-                    self.agent_state["last_screenshot_bytes"] = base64.b64encode(screenshot_bytes).decode('utf-8')
-                    feedback["details"]["filename"] = filename
-                else:
-                    feedback["status"] = "failure"
-                    feedback["message"] = "Screen capture failed."
-            elif action_type == "move_mouse":
-                x = int(parsed_action.get("x", 0))
-                y = int(parsed_action.get("y", 0))
-                self.system_interaction.move_mouse(x, y)
-                feedback["details"]["coordinates"] = {"x": x, "y": y}
-            elif action_type == "wait":
-                duration = parsed_action.get("duration", 1)
-                try:
-                    duration = float(duration)
-                except Exception:
-                    duration = 1
-                self.logger.info(f"Waiting for {duration} seconds as requested by LLM.")
-                time.sleep(duration)
-                feedback["message"] = f"Waited for {duration} seconds."
-                feedback["details"]["duration"] = duration
-            elif action_type == "task_complete":
-                self.agent_state["status"] = "completed"
-                feedback["message"] = "Task marked as complete."
-            elif action_type == "type_text":
-                text = parsed_action.get("text", "")
-                interval = float(parsed_action.get("interval", 0.05))
-                self.system_interaction.type_text(text, interval=interval)
-                feedback["details"]["text_typed_preview"] = text[:50] + "..."
-                feedback["details"]["open_windows"] = list_open_windows()
-            elif action_type == "press_key":
-                key = parsed_action.get("key", "")
-                self.system_interaction.press_key(key)
-                feedback["details"]["key"] = key
-            elif action_type == "hotkey":
-                keys = parsed_action.get("keys", "").split('+')
-                self.system_interaction.hotkey(*keys)
-                feedback["details"]["keys"] = keys
-            elif action_type == "click":
-                x = parsed_action.get("x")
-                y = parsed_action.get("y")
-                button = parsed_action.get("button", "left")
-                if x is not None and y is not None:
-                    self.system_interaction.click(int(x), int(y), button)
-                else:
-                    self.system_interaction.click(button=button)
-                feedback["details"]["coordinates"] = {"x": x, "y": y}
-                feedback["details"]["button"] = button
-            # elif action_type == "ask_user":
-            #     question = parsed_action.get("question", "")
-            #     self.logger.info(f"Agent asks user: {question}")
-            #     self.agent_state["pending_user_question"] = question
-            #     feedback["details"]["question"] = question
-            #     feedback["message"] = f"User input requested: {question}"
-            #     feedback["status"] = "pending_user_input"
-            elif action_type == "web_search":
-                query = parsed_action.get("query")
-                num_results = int(parsed_action.get("num_results", 3))
-                if self.web_search_tool and query:
-                    result = self.web_search_tool(query, num_results)
-                    feedback["details"]["query"] = query
-                    feedback["details"]["num_results"] = num_results
-                    feedback["details"]["result"] = result[:500] + ("..." if len(result) > 500 else "")
-                    feedback["message"] = f"Web search completed for query: {query}"
-                else:
-                    feedback["status"] = "failure"
-                    feedback["message"] = "web_search action missing 'query' parameter or tool not available."
-            else:
-                self.logger.warning(f"Unknown action type encountered: {action_type}")
-                feedback["status"] = "failure"
-                feedback["message"] = f"Unknown action type: {action_type}"
+            handler(parsed_action, feedback)
         except Exception as e:
             feedback["status"] = "failure"
             feedback["message"] = f"Exception during action execution: {e}"
             self.logger.error(feedback["message"], exc_info=True)
         return feedback
+
+    def execute_actions(self, parsed_actions: list) -> list:
+        """Executes several actions in order and returns their feedback in the same order.
+
+        Consecutive read-only actions run concurrently; any other action waits for them and runs alone,
+        so state-changing actions keep their ordering.
+        """
+        results = []
+        batch = []
+
+        def flush():
+            if len(batch) == 1:
+                results.append(self.execute_action(batch[0]))
+            elif batch:
+                with ThreadPoolExecutor(max_workers=min(len(batch), MAX_PARALLEL_ACTIONS)) as pool:
+                    results.extend(pool.map(self.execute_action, batch))
+            batch.clear()
+
+        for parsed_action in parsed_actions:
+            action_type = str(parsed_action.get("action", "")).strip().lower()
+            if action_type in READ_ONLY_ACTIONS:
+                batch.append(parsed_action)
+            else:
+                flush()
+                results.append(self.execute_action(parsed_action))
+        flush()
+        return results
+
+    def _cached_read(self, action_type: str, path, read):
+        """Returns read(path), reusing a result from the last READ_CACHE_TTL seconds while the path's mtime and size are unchanged.
+
+        Failed reads are not cached.
+        """
+        if not isinstance(path, str):
+            return read(path)
+        try:
+            st = os.stat(os.path.join(self.file_io.base_path, path))
+        except OSError:
+            return read(path)
+        # Changes made outside the agent (editors, other processes) show up as a new mtime or size
+        key = (action_type, path, st.st_mtime_ns, st.st_size)
+        now = time.monotonic()
+        with self._read_cache_lock:
+            entry = self._read_cache.get(key)
+            if entry is not None and now - entry[0] <= READ_CACHE_TTL:
+                self._read_cache.move_to_end(key)
+                self.logger.info("Reusing %s result for %s from %.1fs ago.", action_type, path, now - entry[0])
+                return entry[1]
+        value = read(path)
+        if value is not None:
+            with self._read_cache_lock:
+                self._read_cache[key] = (now, value)
+                self._read_cache.move_to_end(key)
+                if len(self._read_cache) > READ_CACHE_SIZE:
+                    self._read_cache.popitem(last=False)
+        return value
+
+    def _prefetch_enums(self):
+        """Starts the window enumeration, if its TTL has expired, before an action that does not open or close windows."""
+        self._windows_cache.prefetch(self._bg)
+
+    def _refresh_enums(self, processes: bool = False):
+        """Marks the window (and optionally process) lists stale after an action that may change them and re-enumerates them concurrently."""
+        caches = (self._windows_cache, self._processes_cache) if processes else (self._windows_cache,)
+        for cache in caches:
+            cache.mark_stale()
+            cache.prefetch(self._bg)
+
+    def _do_read_file(self, parsed_action: dict, feedback: dict):
+        filename = parsed_action.get("file")
+        content = self._cached_read("read_file", filename, self.file_io.read_file)
+        self.agent_state["last_read_content"] = content
+        feedback["details"]["filename"] = filename
+        feedback["details"]["content_preview"] = content[:200] + "..." if content else "No content"
+        if not content:
+            feedback["status"] = "failure"
+            feedback["message"] = f"File read failed or file is empty for {filename}."
+
+    def _do_write_file(self, parsed_action: dict, feedback: dict):
+        get = parsed_action.get
+        filename, content = get("file"), get("content")
+        if self.file_io.write_file(filename, content):
+            feedback["details"]["filename"] = filename
+            feedback["details"]["content_written_preview"] = content[:100] + "..."
+        else:
+            feedback["status"] = "failure"
+            feedback["message"] = f"Failed to write to {filename}."
+
+    def _do_execute_shell_command(self, parsed_action: dict, feedback: dict):
+        get = parsed_action.get
+        command, background = get("command"), get("background", False)
+        if command:
+            return_code, stdout, stderr = self.system_interaction.execute_shell_command(command, background=background)
+            self._refresh_enums(processes=True)
+            feedback["details"]["command"] = command
+            feedback["details"]["background"] = background
+            feedback["details"]["return_code"] = return_code
+            feedback["details"]["stdout"] = _output_tail(stdout)
+            feedback["details"]["stderr"] = _output_tail(stderr)
+            # Add generic process/window info
+            feedback["details"]["open_windows"] = self._windows_cache.get()
+            feedback["details"]["processes"] = self._processes_cache.get()
+            if return_code == 0:
+                feedback["message"] = f"Command '{command}' executed successfully." if not background else f"Command '{command}' started in background."
+            else:
+                feedback["status"] = "failure"
+                feedback["message"] = f"Command '{command}' failed (Exit Code: {return_code})."
+        else:
+            feedback["status"] = "failure"
+            feedback["message"] = "execute_shell_command action missing 'command' parameter."
+            self.logger.warning(feedback["message"])
+
+    def _do_batch_shell(self, parsed_action: dict, feedback: dict):
+        """Runs several independent shell commands concurrently and reports each result."""
+        inputs = parsed_action.get("inputs") or []
+        inputs = [item for item in inputs if isinstance(item, dict) and item.get("command")]
+        if not inputs:
+            feedback["status"] = "failure"
+            feedback["message"] = "batch_shell action missing a non-empty 'inputs' list of commands."
+            self.logger.warning(feedback["message"])
+            return
+
+        async def run_all():
+            # Subprocesses are awaited on one event loop; the semaphore caps how many run at once
+            semaphore = asyncio.Semaphore(MAX_BATCH_SHELL_WORKERS)
+            async def run(item):
+                async with semaphore:
+                    return await self.system_interaction.execute_shell_command_async(
+                        item["command"],
+                        background=item.get("background", False),
+                        cwd=item.get("cwd"),
+                        timeout=item.get("timeout"),
+                    )
+            return await asyncio.gather(*(run(item) for item in inputs))
+
+        outcomes = asyncio.run(run_all())
+        self._refresh_enums(processes=True)
+        results = []
+        failed = []
+        for item, (return_code, stdout, stderr) in zip(inputs, outcomes):
+            results.append({
+                "command": item["command"],
+                "return_code": return_code,
+                "stdout": _output_tail(stdout),
+                "stderr": _output_tail(stderr),
+            })
+            if return_code != 0 and not item.get("ignore_errors", False):
+                failed.append(item["command"])
+        feedback["details"]["results"] = results
+        # Diagnostics are gathered once for the whole batch
+        feedback["details"]["open_windows"] = self._windows_cache.get()
+        feedback["details"]["processes"] = self._processes_cache.get()
+        if failed:
+            feedback["status"] = "failure"
+            feedback["message"] = f"{len(failed)} of {len(inputs)} batched commands failed: {failed}"
+        else:
+            feedback["message"] = f"All {len(inputs)} batched commands executed successfully."
+
+    def _do_batch(self, parsed_action: dict, feedback: dict):
+        """Runs several actions in one step through execute_actions and reports each result."""
+        steps = parsed_action.get("steps") or []
+        steps = [step for step in steps if isinstance(step, dict) and step.get("action") and step.get("action") != "batch"]
+        if not steps:
+            feedback["status"] = "failure"
+            feedback["message"] = "batch action missing a non-empty 'steps' list of actions."
+            self.logger.warning(feedback["message"])
+            return
+        outcomes = self.execute_actions(steps)
+        feedback["details"]["results"] = [
+            {"action": step["action"], "status": outcome["status"], "message": outcome["message"], "details": outcome["details"]}
+            for step, outcome in zip(steps, outcomes)
+        ]
+        # Concurrent reads each overwrote last_read_content; keep all of them, in step order
+        read_files = [step.get("file") for step, outcome in zip(steps, outcomes) if step["action"] == "read_file" and outcome["status"] == "success"]
+        if len(read_files) > 1:
+            # Served from the read cache that the reads just filled
+            self.agent_state["last_read_content"] = "\n\n".join(
+                f"--- {filename} ---\n{self._cached_read('read_file', filename, self.file_io.read_file)}" for filename in read_files
+            )
+        failed = [step["action"] for step, outcome in zip(steps, outcomes) if outcome["status"] != "success"]
+        if failed:
+            feedback["status"] = "failure"
+            feedback["message"] = f"{len(failed)} of {len(steps)} batched actions failed: {failed}"
+        else:
+            feedback["message"] = f"All {len(steps)} batched actions executed successfully."
+
+    def _do_focus_window(self, parsed_action: dict, feedback: dict):
+        title_substring = parsed_action.get("title_substring")
+        if title_substring:
+            # Focusing does not change the set of window titles, so the list is gathered meanwhile
+            self._prefetch_enums()
+            success = self.system_interaction.focus_window(title_substring)
+            feedback["details"]["title_substring"] = title_substring
+            feedback["details"]["focused"] = success
+            feedback["details"]["open_windows"] = self._windows_cache.get()
+            if success:
+                feedback["message"] = f"Focused window with title containing '{title_substring}'."
+            else:
+                feedback["status"] = "failure"
+                feedback["message"] = f"Could not find or focus window with title containing '{title_substring}'."
+        else:
+            feedback["status"] = "failure"
+            feedback["message"] = "focus_window action missing 'title_substring' parameter."
+            self.logger.warning(feedback["message"])
+
+    def _do_list_directory(self, parsed_action: dict, feedback: dict):
+        path = parsed_action.get("path", ".")
+        contents = self._cached_read("list_directory", path, self.file_io.list_directory)
+        self.agent_state["last_directory_list"] = contents
+        feedback["details"]["path"] = path
+        feedback["details"]["contents"] = contents
+        if contents is None:
+            feedback["status"] = "failure"
+            feedback["message"] = "Directory listing failed."
+
+    def _do_capture_screen(self, parsed_action: dict, feedback: dict):
+        filename = parsed_action.get("file")
+        screenshot_bytes = self.screen_capture.capture_screen_bytes(filename)
+        if screenshot_bytes:
+            self.last_screenshot_bytes = screenshot_bytes
+            feedback["details"]["filename"] = filename
+        else:
+            feedback["status"] = "failure"
+            feedback["message"] = "Screen capture failed."
+
+    def _to_screen(self, x, y) -> tuple[int, int]:
+        """Maps coordinates read off the (possibly downscaled) LLM screenshot back to screen pixels."""
+        scale = self.screen_capture.last_image_scale
+        return round(float(x) * scale), round(float(y) * scale)
+
+    def _do_move_mouse(self, parsed_action: dict, feedback: dict):
+        get = parsed_action.get
+        x, y = int(get("x", 0)), int(get("y", 0))
+        self.system_interaction.move_mouse(*self._to_screen(x, y))
+        feedback["details"]["coordinates"] = {"x": x, "y": y}
+
+    def _do_wait(self, parsed_action: dict, feedback: dict):
+        duration = parsed_action.get("duration", 1)
+        try:
+            duration = float(duration)
+        except Exception:
+            duration = 1
+        self.logger.info("Waiting for %s seconds as requested by LLM.", duration)
+        time.sleep(duration)
+        feedback["message"] = f"Waited for {duration} seconds."
+        feedback["details"]["duration"] = duration
+
+    def _do_task_complete(self, parsed_action: dict, feedback: dict):
+        self.agent_state["status"] = "completed"
+        feedback["message"] = "Task marked as complete."
+
+    def _do_type_text(self, parsed_action: dict, feedback: dict):
+        get = parsed_action.get
+        text, interval = get("text", ""), float(get("interval", 0.05))
+        self._prefetch_enums()
+        self.system_interaction.type_text(text, interval=interval)
+        feedback["details"]["text_typed_preview"] = text[:50] + "..."
+        feedback["details"]["open_windows"] = self._windows_cache.get()
+
+    def _do_press_key(self, parsed_action: dict, feedback: dict):
+        key = parsed_action.get("key", "")
+        self.system_interaction.press_key(key)
+        feedback["details"]["key"] = key
+
+    def _do_hotkey(self, parsed_action: dict, feedback: dict):
+        keys = _split_hotkey(parsed_action.get("keys", ""))
+        self.system_interaction.hotkey(*keys)
+        feedback["details"]["keys"] = keys
+
+    def _do_click(self, parsed_action: dict, feedback: dict):
+        get = parsed_action.get
+        x, y, button = get("x"), get("y"), get("button", "left")
+        if x is not None and y is not None:
+            self.system_interaction.click(*self._to_screen(x, y), button)
+        else:
+            self.system_interaction.click(button=button)
+        feedback["details"]["coordinates"] = {"x": x, "y": y}
+        feedback["details"]["button"] = button
+
+    # def _do_ask_user(self, parsed_action: dict, feedback: dict):
+    #     question = parsed_action.get("question", "")
+    #     self.logger.info(f"Agent asks user: {question}")
+    #     self.agent_state["pending_user_question"] = question
+    #     feedback["details"]["question"] = question
+    #     feedback["message"] = f"User input requested: {question}"
+    #     feedback["status"] = "pending_user_input"
+
+    def _do_web_search(self, parsed_action: dict, feedback: dict):
+        get = parsed_action.get
+        query, num_results, deep = get("query"), int(get("num_results", 3)), bool(get("deep", False))
+        if self.web_search_tool and query:
+            result = self.web_search_tool(query, num_results, deep=deep)
+            feedback["details"]["query"] = query
+            feedback["details"]["num_results"] = num_results
+            feedback["details"]["result"] = result[:500] + ("..." if len(result) > 500 else "")
+            if _is_failed_search(result):
+                # The tool reports errors and empty searches as text; they must not count as a completed step
+                feedback["status"] = "failure"
+                feedback["message"] = f"Web search for query '{query}' returned no usable results: {result[:200]}"
+            else:
+                feedback["message"] = f"Web search completed for query: {query}"
+        else:
+            feedback["status"] = "failure"
+            feedback["message"] = "web_search action missing 'query' parameter or tool not available."
@@ -10,10 +10,14 @@ from ..core.global_prompt import GlobalPrompt
 from ..utils.platform_utils import is_windows, is_mac, is_linux, get_platform_name
 from ..utils.path_utils import resolve_special_folder
 from ..utils.file_search import find_video_files_by_keyword, find_video_files_by_keyword_recursive
-from .llm_interface import LLMInterface
-from .action_executor import ActionExecutor
+from ..utils.history import bounded_history, recent_history
+from ..utils import json_utils
+from .llm_interface import LLMInterface, iter_plan_steps, extract_first_action, first_json_object, default_response_cache
+from .llm.cache import LLMResponseCache
+from .action_executor import ActionExecutor, READ_ONLY_ACTIONS, MAX_PARALLEL_ACTIONS
 import time
 import json
+import asyncio
 import io
 import base64
 from PIL import Image
@@ -21,13 +25,120 @@ from ..utils.logger import Logger
 from ..action.web_search import web_search
 import os
 import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Tools description for the LLM
+_TOOLS_DESCRIPTION_TEMPLATE = """
+Available Tools and their usage (Current platform: {platform_name}) (output ONLY a JSON object with 'action' and parameters):
+
+- read_file(file: str): Reads the content of a specified file.
+  Example: {{"action": "read_file", "file": "README.md"}}
+- write_file(file: str, content: str): Writes content to a specified file.
+  Example: {{"action": "write_file", "file": "output.txt", "content": "Hello!"}}
+- execute_shell_command(command: str | list[str], background: bool = False): Executes a shell command. If launching a GUI app, set background=true. A list of arguments runs the program directly without a shell and is faster.
+  Example: {{"action": "execute_shell_command", "command": "notepad", "background": true}}
+  Example: {{"action": "execute_shell_command", "command": ["git", "status"]}}
+- batch_shell(inputs: list): Runs several independent shell commands concurrently in one step. Each input has "command" and optional "background", "cwd", "timeout" (seconds) and "ignore_errors". Pack commands into one batch when none depends on another's output or side effects (e.g. exploring a project layout, reading several files, running independent checks); use separate steps when order matters.
+  Example: {{"action": "batch_shell", "inputs": [{{"command": ["git", "status"]}}, {{"command": "dir", "ignore_errors": true}}]}}
+- batch(steps: list): Runs several actions in one step. Consecutive read-only actions (read_file, list_directory, capture_screen, web_search) run concurrently; any other action runs alone, in the given order. Use it to gather several observations at once (e.g. reading several files) instead of spending a step on each. A batch cannot contain another batch.
+  Example: {{"action": "batch", "steps": [{{"action": "read_file", "file": "README.md"}}, {{"action": "list_directory", "path": "src"}}]}}
+- focus_window(title_substring: str): Focuses a window whose title contains the given substring. (Windows only)
+  Example: {{"action": "focus_window", "title_substring": "Notepad"}}
+- list_directory(path: str = "."): Lists the contents of a directory.
+  Example: {{"action": "list_directory", "path": "."}}
+- capture_screen(file: str): Captures the current screen and saves it. Use this to get visual context.
+  Example: {{"action": "capture_screen", "file": "screen.png"}}
+- move_mouse(x: int, y: int): Moves the mouse to absolute coordinates, measured in pixels of the screenshot you were given.
+  Example: {{"action": "move_mouse", "x": 100, "y": 200}}
+- click(x: int = -1, y: int = -1, button: str = "left"): Clicks at a specified position (in screenshot pixels) or current position.
+  Example: {{"action": "click", "x": 100, "y": 200, "button": "left"}}
+- type_text(text: str): Types the given text.
+  Example: {{"action": "type_text", "text": "Hello world!"}}
+- press_key(key: str): Presses a single keyboard key.
+  Example: {{"action": "press_key", "key": "enter"}}
+- hotkey(keys: str): Presses a combination of keys (e.g., "ctrl+c").
+  Example: {{"action": "hotkey", "keys": "ctrl+c"}}
+- store_knowledge(key: str, value: str): Stores information in the agent's knowledge base.
+  Example: {{"action": "store_knowledge", "key": "last_app", "value": "notepad"}}
+- retrieve_knowledge(key: str): Retrieves information from the agent's knowledge base.
+  Example: {{"action": "retrieve_knowledge", "key": "last_app"}}
+- wait(duration: int): Pauses agent execution for a specified number of seconds.
+  Example: {{"action": "wait", "duration": 3}}
+- decompose_subtask(subtask_description: str): If a step is too complex, break it down into a new plan and execute recursively.
+  Example: {{"action": "decompose_subtask", "subtask_description": "Draw a circle in Paint"}}
+- task_complete: Indicates that the current overall task is finished.
+  Example: {{"action": "task_complete"}}
+- resolve_special_folder(folder_name: str): Resolves the absolute path of a special folder (like 'videos', 'documents', 'desktop', etc.) in a platform-agnostic way. Use this to get the correct path for any user folder.
+  Example: {{"action": "resolve_special_folder", "folder_name": "videos"}}
+- web_search(query: str, num_results: int = 3, deep: bool = False): Performs a web search and returns a summary of the top results. Set deep=true to read the content of the top result page instead of the search snippets.
+  Example: {{"action": "web_search", "query": "latest AI news", "num_results": 2}}
+"""
+# Formatted once at import time since the platform never changes at runtime
+_TOOLS_DESCRIPTION = _TOOLS_DESCRIPTION_TEMPLATE.format(platform_name=get_platform_name())
+
+# Agent state changes are written to the knowledge base at most this often, in seconds
+STATE_SAVE_INTERVAL = 1.0
+
+# Minimum wall time of one run_agent iteration, in seconds
+MIN_ITERATION_SECONDS = 0.2
+
+# Request the next plan step's action while the current one is being reflected on (AGENT_SPECULATE=1 enables).
+# Off by default: a failed reflection discards the speculative call, so it costs an extra LLM request
+SPECULATE_NEXT_ACTION = os.environ.get("AGENT_SPECULATE", "0") == "1"
+
+# Per-task limits of run_agent
+MAX_TOTAL_STEPS = 50
+MAX_PLANNING_CYCLES = 3  # Maximum times to re-plan for the same task
+MAX_PARSE_RETRIES = 3
+MAX_ACTION_EXECUTION_RETRIES = 2  # Max retries for a single action within a plan step
+
+# Actions whose executor feedback fully describes the outcome; a successful result needs no LLM reflection
+SELF_VERIFYING_ACTIONS = frozenset({"read_file", "write_file", "list_directory", "wait", "web_search", "capture_screen", "move_mouse"})
+
+# Actions whose outcome is not visible on screen; reflecting on them gains nothing from the (pre-action) screenshot
+NON_VISUAL_ACTIONS = frozenset({"read_file", "write_file", "list_directory", "wait", "web_search", "batch_shell", "execute_shell_command"})
+
+# Plan steps that change nothing, need no fresh screenshot and no reflection; consecutive ones get their action calls together
+INDEPENDENT_ACTIONS = READ_ONLY_ACTIONS & NON_VISUAL_ACTIONS & SELF_VERIFYING_ACTIONS
+# Argument an independent step must already carry in the plan to be batched; without it the step may depend on an earlier one's output
+INDEPENDENT_ACTION_ARGS = {"read_file": "file", "list_directory": "path", "web_search": "query"}
+
+def _is_fixed_step(step: dict) -> bool:
+    """Whether step is an independent action whose target is spelled out in the plan."""
+    action = step.get("action")
+    return action in INDEPENDENT_ACTIONS and bool(step.get(INDEPENDENT_ACTION_ARGS.get(action)))
+
+class _StreamedPlan:
+    """Plan steps arriving from a streaming LLM response; readers can wait for step i before the whole plan is in."""
+    def __init__(self):
+        self.steps = []
+        self.done = False
+        self.first_action = None  # Ready-to-run action for step 0, when the planner supplied one
+        self._cond = threading.Condition()
+
+    def add(self, step):
+        with self._cond:
+            self.steps.append(step)
+            self._cond.notify_all()
+
+    def finish(self):
+        with self._cond:
+            self.done = True
+            self._cond.notify_all()
+
+    def wait_for(self, index: int) -> bool:
+        """Blocks until step index has arrived or the plan is complete; returns whether the step exists."""
+        with self._cond:
+            self._cond.wait_for(lambda: len(self.steps) > index or self.done)
+            return len(self.steps) > index
 
 class AgentCore:
     """Main orchestrator for agent perception, memory, planning, and action."""
     llm_call_count = 0
     llm_call_timestamps = []
 
-    def __init__(self, llm_client=None):
+    def __init__(self, llm_client=None, llm_cache: LLMResponseCache | None = None, llm_max_calls_per_minute: int | None = None, llm_max_concurrency: int | None = None):
         self.file_io = FileIO()
         self.screen_capture = ScreenCapture()
         self.system_interaction = SystemInteraction()
@@ -38,12 +149,11 @@ class AgentCore:
         self.agent_state = self.knowledge_base.load_agent_state() or {
             "status": "idle",
             "current_task": "None",
-            "history": [],
             "current_plan": [],
             "plan_step": 0
         }
+        self.agent_state["history"] = bounded_history(self.agent_state.get("history", []))
         self.logger = Logger()
-        self.last_screenshot_pil = None
         self.stop_flag = False  # Add stop flag
         self.interactive = True  # Add interactive flag
         self.failed_steps = {}
@@ -51,12 +161,98 @@ class AgentCore:
         self.llm_call_count = 0
         self.llm_call_timestamps = []
 
-        self.llm_interface = LLMInterface(self.llm_client, self.logger)
+        # LLM responses are cached on disk only when configured (see llm_interface.default_response_cache)
+        self.llm_interface = LLMInterface(
+            self.llm_client, self.logger,
+            cache=llm_cache or default_response_cache(),
+            max_calls_per_minute=llm_max_calls_per_minute,
+            max_concurrency=llm_max_concurrency
+        )
         self.action_executor = ActionExecutor(self.file_io, self.screen_capture, self.system_interaction, self.logger, self.agent_state)
+        # Background pool for I/O that can overlap LLM round trips
+        self._io_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="agent-io")
+        self._tools_description = _TOOLS_DESCRIPTION
+        self._planning_static_prefix = self.global_prompt_manager.get_planning_static_prefix(self._tools_description)
+        self._screenshot_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'logs', 'screens', 'current_screen_step.png')
+        os.makedirs(os.path.dirname(self._screenshot_path), exist_ok=True)
+        # Debounced background persistence of agent_state; history entries are journaled incrementally
+        self._pending_state = None
+        self._pending_history = None  # New history entries to append, or None to rewrite the stored history
+        self._history_tail = self.agent_state["history"][-1] if self.agent_state["history"] else None  # Last entry already stored
+        self._state_lock = threading.Lock()
+        self._state_write_lock = threading.Lock()  # Held across a write so an older snapshot never lands after a newer one
+        self._plan_stream = None
+        self._speculation = None  # (action prompt, future of (screenshot bytes, LLM response)) for the next plan step
+        self._serial_step = None  # Plan step index that stopped an independent-step batch; it runs on its own next time
+        self._state_dirty = threading.Event()
+        # run_agent dispatches on agent_state["status"]; statuses without a handler end the run
+        self._state_handlers = {
+            "planning": self._handle_planning,
+            "executing_plan": self._handle_executing_plan,
+            "completed": self._handle_completed,
+        }
+        threading.Thread(target=self._persist_state_loop, name="agent-state-saver", daemon=True).start()
+
+    def _mark_state_dirty(self):
+        """Schedules agent_state to be saved; repeated calls within STATE_SAVE_INTERVAL coalesce into one write."""
+        snapshot = dict(self.agent_state)
+        history = snapshot.get("history", ())
+        new_entries = self._unsaved_history(history)
+        with self._state_lock:
+            if new_entries is None or self._pending_history is None and self._pending_state is not None:
+                # History was replaced (e.g. by a reset) or a rewrite is already queued: store it in full
+                snapshot["history"] = list(history)  # The loop keeps appending to the live deque
+                self._pending_history = None
+            else:
+                snapshot.pop("history", None)
+                self._pending_history = (self._pending_history or []) + new_entries
+            self._pending_state = snapshot
+            self._history_tail = history[-1] if history else None
+        self._state_dirty.set()
+
+    def _unsaved_history(self, history) -> list | None:
+        """History entries appended since the last _mark_state_dirty, or None if the history no longer extends what was saved."""
+        tail = self._history_tail
+        new_entries = []
+        for entry in reversed(history):
+            if entry is tail:
+                break
+            new_entries.append(entry)
+        else:
+            if tail is not None:
+                return None
+        new_entries.reverse()
+        return new_entries
 
-    def call_llm(self, prompt: str, image_data: bytes | None = None) -> str:
-        """Calls the Large Language Model (LLM) with a prompt and optional image data."""
-        return self.llm_interface.call_llm(prompt, image_data)
+    def _persist_state_loop(self):
+        while True:
+            self._state_dirty.wait()
+            time.sleep(STATE_SAVE_INTERVAL)
+            self._state_dirty.clear()
+            self._write_pending_state()
+
+    def _write_pending_state(self):
+        """Writes the latest scheduled snapshot and the history entries queued with it."""
+        with self._state_write_lock:
+            with self._state_lock:
+                state, new_history = self._pending_state, self._pending_history
+                self._pending_history = []
+            if state is not None:
+                self.knowledge_base.store_agent_state(state, new_history)
+
+    def flush_state(self):
+        """Saves agent_state now instead of waiting for the background saver, e.g. before the process exits."""
+        self._mark_state_dirty()
+        self._state_dirty.clear()
+        self._write_pending_state()
+
+    def call_llm(self, prompt: str, image_data: bytes | None = None, static_prefix: str | None = None) -> str:
+        """Calls the Large Language Model (LLM) with a prompt and optional image data; static_prefix marks the prompt's cacheable start."""
+        return self.llm_interface.call_llm(prompt, image_data, static_prefix)
+
+    async def acall_llm(self, prompt: str, image_data: bytes | None = None, static_prefix: str | None = None) -> str:
+        """Async variant of call_llm for overlapping independent LLM calls or I/O."""
+        return await self.llm_interface.acall_llm(prompt, image_data, static_prefix)
 
     def parse_llm_response(self, response: str) -> dict:
         """Parses the LLM's response, extracting a JSON object for action or plan."""
@@ -67,92 +263,243 @@ class AgentCore:
         return self.action_executor.execute_action(parsed_action)
 
     def _get_available_tools_description(self) -> str:
-        """Generates a string describing the available tools for the LLM, with platform notes and usage examples."""
-        platform_note = f"(Current platform: {get_platform_name()})"
-        tools_description = f"""
-Available Tools and their usage {platform_note} (output ONLY a JSON object with 'action' and parameters):
+        """Returns the description of the available tools for the LLM, with platform notes and usage examples."""
+        return self._tools_description
 
-- read_file(file: str): Reads the content of a specified file.
-  Example: {{"action": "read_file", "file": "README.md"}}
-- write_file(file: str, content: str): Writes content to a specified file.
-  Example: {{"action": "write_file", "file": "output.txt", "content": "Hello!"}}
-- execute_shell_command(command: str, background: bool = False): Executes a shell command. If launching a GUI app, set background=true.
-  Example: {{"action": "execute_shell_command", "command": "notepad", "background": true}}
-- focus_window(title_substring: str): Focuses a window whose title contains the given substring. (Windows only)
-  Example: {{"action": "focus_window", "title_substring": "Notepad"}}
-- list_directory(path: str = "."): Lists the contents of a directory.
-  Example: {{"action": "list_directory", "path": "."}}
-- capture_screen(file: str): Captures the current screen and saves it. Use this to get visual context.
-  Example: {{"action": "capture_screen", "file": "screen.png"}}
-- move_mouse(x: int, y: int): Moves the mouse to absolute screen coordinates.
-  Example: {{"action": "move_mouse", "x": 100, "y": 200}}
-- click(x: int = -1, y: int = -1, button: str = "left"): Clicks at a specified position or current position.
-  Example: {{"action": "click", "x": 100, "y": 200, "button": "left"}}
-- type_text(text: str): Types the given text.
-  Example: {{"action": "type_text", "text": "Hello world!"}}
-- press_key(key: str): Presses a single keyboard key.
-  Example: {{"action": "press_key", "key": "enter"}}
-- hotkey(keys: str): Presses a combination of keys (e.g., "ctrl+c").
-  Example: {{"action": "hotkey", "keys": "ctrl+c"}}
-- store_knowledge(key: str, value: str): Stores information in the agent's knowledge base.
-  Example: {{"action": "store_knowledge", "key": "last_app", "value": "notepad"}}
-- retrieve_knowledge(key: str): Retrieves information from the agent's knowledge base.
-  Example: {{"action": "retrieve_knowledge", "key": "last_app"}}
-- wait(duration: int): Pauses agent execution for a specified number of seconds.
-  Example: {{"action": "wait", "duration": 3}}
-- decompose_subtask(subtask_description: str): If a step is too complex, break it down into a new plan and execute recursively.
-  Example: {{"action": "decompose_subtask", "subtask_description": "Draw a circle in Paint"}}
-- task_complete: Indicates that the current overall task is finished.
-  Example: {{"action": "task_complete"}}
-- resolve_special_folder(folder_name: str): Resolves the absolute path of a special folder (like 'videos', 'documents', 'desktop', etc.) in a platform-agnostic way. Use this to get the correct path for any user folder.
-  Example: {{"action": "resolve_special_folder", "folder_name": "videos"}}
-- web_search(query: str, num_results: int = 3): Performs a web search and returns a summary of the top results.
-  Example: {{"action": "web_search", "query": "latest AI news", "num_results": 2}}
-"""
-        return tools_description
-
-    def _plan_task(self, task_description: str, current_context: str) -> list[dict]:
-        """Uses the LLM to generate a plan (a sequence of actions) to achieve the task."""
-        planning_prompt = self.global_prompt_manager.get_planning_prompt(
+    def _planning_prompt(self, task_description: str, current_context: str) -> str:
+        return self.global_prompt_manager.get_planning_prompt(
             task_description=task_description,
             current_context=current_context,
-            tools_description=self._get_available_tools_description(),
+            tools_description=self._tools_description,
             history=self.agent_state["history"] # Provide history for better planning
         )
+
+    def _start_plan_stream(self, task_description: str, current_context: str) -> _StreamedPlan:
+        """Requests a plan with a streaming LLM call; steps become available to run_agent as soon as each one arrives."""
+        planning_prompt = self._planning_prompt(task_description, current_context)
+        plan = _StreamedPlan()
+        self.logger.info("Agent is generating a plan (streaming)...")
+        threading.Thread(target=self._stream_plan, args=(planning_prompt, plan), name="agent-plan-stream", daemon=True).start()
+        return plan
+
+    def _stream_plan(self, planning_prompt: str, plan: _StreamedPlan):
+        chunks = []
+        def recorded():
+            for chunk in self.llm_interface.stream_llm(planning_prompt, static_prefix=self._planning_static_prefix):
+                chunks.append(chunk)
+                yield chunk
+        stream = recorded()
+        try:
+            for step in iter_plan_steps(stream):
+                if isinstance(step, dict):
+                    if not plan.steps:
+                        # "first_action" precedes "plan" in the response, so it is complete by now
+                        plan.first_action = extract_first_action("".join(chunks))
+                    plan.add(step)
+            for _ in stream:  # Drain the rest so the raw response is complete for logging
+                pass
+            llm_response = "".join(chunks)
+            if plan.steps:
+                self.logger.info("Generated plan: %s", plan.steps)
+            else:
+                self.logger.error("LLM failed to generate a valid plan: %s", self.parse_llm_response(llm_response).get('error', llm_response))
+                self.logger.error("Raw LLM response: %s", llm_response)
+                self.logger.error("Planning prompt was: %s", planning_prompt)
+        except Exception as e:
+            # Steps that fully arrived stay runnable; the agent replans once it runs past them
+            self.logger.error("Plan stream failed after %s steps: %s", len(plan.steps), e, exc_info=True)
+        finally:
+            plan.finish()
+
+    def _plan_has_step(self, index: int) -> bool:
+        """Whether the current plan has a step at index, waiting for it if the plan is still streaming in."""
+        plan = self._plan_stream
+        if plan is not None and plan.steps is self.agent_state["current_plan"]:
+            return plan.wait_for(index)
+        return index < len(self.agent_state["current_plan"])
+
+    def _take_first_action(self, current_step: dict) -> dict | None:
+        """Returns the planner's action for step 0 of the current plan, at most once; None when the action LLM call is needed."""
+        plan = self._plan_stream
+        if plan is None or plan.first_action is None or plan.steps is not self.agent_state["current_plan"] or self.agent_state["plan_step"] != 0:
+            return None
+        first_action, plan.first_action = plan.first_action, None
+        if first_action.get("action") != current_step.get("action"):
+            return None
+        return first_action
+
+    def _prefetch_capture(self):
+        """Starts capturing the next observation in the background unless one is already pending."""
+        if self._pending_capture is None:
+            self._pending_capture = self._io_pool.submit(self.screen_capture.capture_screen_bytes, self._screenshot_path)
+
+    def _action_prompt(self, current_step: dict, last_action_feedback: dict | None = None) -> str:
+        """Action execution prompt for current_step; last_action_feedback overrides the one in agent_state."""
+        if last_action_feedback is None:
+            last_action_feedback = self.agent_state.get('last_action_feedback', {"status": "none", "message": "No previous action feedback."})
+        return self.global_prompt_manager.get_action_execution_prompt(
+            current_task_description=self.agent_state["current_task"],
+            current_plan_step=current_step,
+            last_action_feedback=json_utils.dumps(last_action_feedback),
+            last_read_content=self.agent_state.get('last_read_content'),
+            last_directory_list=self.agent_state.get('last_directory_list'),
+            last_retrieved_knowledge=self.agent_state.get('last_retrieved_knowledge'),
+            history=recent_history(self.agent_state["history"], 5),
+            failed_steps_summary=self.failed_steps,
+            successful_steps_summary=list(self.successful_steps)
+        )
+
+    def _action_static_prefix(self) -> str:
+        """Start of every action prompt for the current task."""
+        return self.global_prompt_manager.get_action_static_prefix(self.agent_state["current_task"])
+
+    def _speculate_next_action(self, action_result_feedback: dict):
+        """Starts the next plan step's action LLM call, assuming the reflection now running will confirm success."""
+        next_index = self.agent_state["plan_step"] + 1
+        plan = self.agent_state["current_plan"]
+        if len(plan) <= next_index or self._pending_capture is None:
+            return
+        prompt = self._action_prompt(plan[next_index], last_action_feedback=action_result_feedback)
+        capture = self._pending_capture
+        static_prefix = self._action_static_prefix()
+        def call():
+            image = capture.result()
+            return image, self.call_llm(prompt, image_data=image, static_prefix=static_prefix)
+        self._speculation = (prompt, self._io_pool.submit(call))
+
+    def _take_speculation(self, prompt: str, image_data: bytes | None) -> str | None:
+        """Returns the speculative LLM response if it was made for exactly this prompt and screenshot, else None."""
+        speculation, self._speculation = self._speculation, None
+        if speculation is None or speculation[0] != prompt:
+            return None
+        image, response = speculation[1].result()
+        return response if image is image_data else None
+
+    def _independent_steps(self) -> list[dict]:
+        """The run of consecutive fixed-argument INDEPENDENT_ACTIONS plan steps starting at the current one, at most MAX_PARALLEL_ACTIONS long."""
+        plan, start = self.agent_state["current_plan"], self.agent_state["plan_step"]
+        end = start
+        while end < len(plan) and end - start < MAX_PARALLEL_ACTIONS and _is_fixed_step(plan[end]):
+            end += 1
+        return plan[start:end]
+
+    def _execute_independent_steps(self, steps: list[dict], screen_image_bytes: bytes | None) -> str | None:
+        """Requests the actions of several independent plan steps concurrently, then executes them in plan order.
+
+        Only steps whose target is fixed in the plan are batched, so no prompt lacks an earlier step's output.
+        Steps are committed up to the first one whose response is not the planned action on the planned target,
+        or whose action fails; that step is left to the regular one-step path, which reflects on it and retries.
+        """
+        prompts = [self._action_prompt(step) for step in steps]
+        print(f"\n--- Agent Acting (from plan): {len(steps)} independent steps ---")
+        llm_responses = asyncio.run(self.llm_interface.acall_llm_many(prompts, image_data=screen_image_bytes, static_prefix=self._action_static_prefix()))
+        if self.stop_flag:
+            return "aborted"
+        for step, llm_response_text in zip(steps, llm_responses):
+            parsed_action = self.parse_llm_response(llm_response_text)
+            target = INDEPENDENT_ACTION_ARGS[step["action"]]
+            if parsed_action.get("action") != step.get("action") or parsed_action.get(target) != step.get(target):
+                self._serial_step = self.agent_state["plan_step"]
+                break
+            action_result_feedback = self.execute_action(parsed_action)
+            print(f"Action Result: {action_result_feedback['status'].upper()} - {action_result_feedback['message']}")
+            self.agent_state["last_action_feedback"] = action_result_feedback
+            if action_result_feedback["status"] != "success":
+                self._serial_step = self.agent_state["plan_step"]
+                break
+            self.logger.info("Executor confirmed action success for plan step %s. Moving to next step.", self.agent_state['plan_step'])
+            self.agent_state["plan_step"] += 1
+        self._prefetch_capture()
+        if not self._plan_has_step(self.agent_state["plan_step"]):
+            print("\n--- Agent finished all plan steps. ---")
+            return None
+        return self.agent_state["status"]
+
+    def _plan_task(self, task_description: str, current_context: str) -> list[dict]:
+        """Uses the LLM to generate a plan (a sequence of actions) to achieve the task."""
+        planning_prompt = self._planning_prompt(task_description, current_context)
         self.logger.info("Agent is generating a plan...")
-        llm_response = self.call_llm(planning_prompt)
+        return self._plan_from_response(self.call_llm(planning_prompt, static_prefix=self._planning_static_prefix), planning_prompt)
+
+    def _plan_tasks_concurrently(self, subtasks: list[str], current_context: str) -> list[list[dict]]:
+        """Plans each subtask with its own LLM call, all calls in flight together; returns the plans in order."""
+        planning_prompts = [self._planning_prompt(subtask, current_context) for subtask in subtasks]
+        self.logger.info("Agent is generating %s plans concurrently...", len(subtasks))
+        llm_responses = asyncio.run(self.llm_interface.acall_llm_many(planning_prompts, static_prefix=self._planning_static_prefix))
+        return [self._plan_from_response(llm_response, planning_prompt) for llm_response, planning_prompt in zip(llm_responses, planning_prompts)]
+
+    def _plan_from_response(self, llm_response: str, planning_prompt: str) -> list[dict]:
         parsed_response = self.parse_llm_response(llm_response)
 
         if "plan" in parsed_response and isinstance(parsed_response["plan"], list):
-            self.logger.info(f"Generated plan: {parsed_response['plan']}")
+            self.logger.info("Generated plan: %s", parsed_response['plan'])
             return parsed_response["plan"]
         else:
-            self.logger.error(f"LLM failed to generate a valid plan: {parsed_response.get('error', llm_response)}")
-            self.logger.error(f"Raw LLM response: {llm_response}")
-            self.logger.error(f"Planning prompt was: {planning_prompt}")
+            self.logger.error("LLM failed to generate a valid plan: %s", parsed_response.get('error', llm_response))
+            self.logger.error("Raw LLM response: %s", llm_response)
+            self.logger.error("Planning prompt was: %s", planning_prompt)
             self.agent_state["status"] = "idle"  # Set to idle so user can retry
             return [] # Return empty plan if invalid
 
-    def _execute_subplan(self, subtask_description: str, parent_context: str = "") -> bool:
-        """Recursively plan and execute a subtask. Returns True if successful."""
+    def _plan_tasks_batch(self, subtasks: list[str], parent_context: str) -> list[list[dict]]:
+        """Plans several independent subtasks with a single LLM call; returns one plan per subtask, in order.
+
+        Subtasks the batched answer leaves out or malforms are planned individually, concurrently.
+        """
+        if len(subtasks) == 1:
+            return [self._plan_task(subtasks[0], parent_context)]
+        batch_prompt = self.global_prompt_manager.get_batch_planning_prompt(
+            subtasks=subtasks,
+            current_context=parent_context,
+            tools_description=self._tools_description,
+            history=self.agent_state["history"]
+        )
+        self.logger.info("Agent is generating plans for %s subtasks in one call...", len(subtasks))
+        llm_response = self.call_llm(batch_prompt)
+        plans_by_id = {}
+        try:
+            parsed = first_json_object(llm_response)
+            for entry in parsed.get("plans", []):
+                if isinstance(entry, dict) and isinstance(entry.get("plan"), list):
+                    plans_by_id[entry.get("id")] = entry["plan"]
+        except (ValueError, AttributeError) as e:
+            self.logger.error("Could not parse batched subtask plans: %s. Raw LLM response: %s", e, llm_response)
+        if len(plans_by_id) != len(subtasks):
+            self.logger.warning("Batched planning returned %s plans for %s subtasks; planning the rest concurrently.", len(plans_by_id), len(subtasks))
+        missing = [i for i in range(len(subtasks)) if not plans_by_id.get(i)]
+        if missing:
+            for i, plan in zip(missing, self._plan_tasks_concurrently([subtasks[i] for i in missing], parent_context)):
+                plans_by_id[i] = plan
+        return [plans_by_id[i] for i in range(len(subtasks))]
+
+    def _execute_subplan(self, subtask_description: str, parent_context: str = "", subplan: list[dict] | None = None) -> bool:
+        """Recursively plan and execute a subtask. Returns True if successful. subplan skips planning when already known."""
         print(f"\n--- Decomposing subtask: {subtask_description} ---")
-        subplan = self._plan_task(subtask_description, parent_context)
+        if subplan is None:
+            subplan = self._plan_task(subtask_description, parent_context)
         if not subplan:
-            self.logger.error(f"Failed to generate subplan for subtask: {subtask_description}")
+            self.logger.error("Failed to generate subplan for subtask: %s", subtask_description)
             return False
-        for step in subplan:
-            print(f"\n[Subtask] Executing: {step.get('description', step.get('action'))}")
-            parsed_action = step
+        i = 0
+        while i < len(subplan):
+            parsed_action = subplan[i]
             if parsed_action.get('action') == 'decompose_subtask':
-                # Recursively decompose further
-                nested_desc = parsed_action.get('subtask_description', 'No description provided')
-                if not self._execute_subplan(nested_desc, parent_context):
-                    return False
-            else:
-                feedback = self.execute_action(parsed_action)
-                if feedback.get('status') != 'success':
-                    print(f"[Subtask] Step failed: {feedback.get('message')}")
-                    return False
+                # Recursively decompose further; adjacent sibling subtasks are planned together in one LLM call
+                end = i
+                while end < len(subplan) and subplan[end].get('action') == 'decompose_subtask':
+                    end += 1
+                nested_descs = [step.get('subtask_description', 'No description provided') for step in subplan[i:end]]
+                for nested_desc, nested_plan in zip(nested_descs, self._plan_tasks_batch(nested_descs, parent_context)):
+                    if not self._execute_subplan(nested_desc, parent_context, subplan=nested_plan):
+                        return False
+                i = end
+                continue
+            print(f"\n[Subtask] Executing: {parsed_action.get('description', parsed_action.get('action'))}")
+            feedback = self.execute_action(parsed_action)
+            if feedback.get('status') != 'success':
+                print(f"[Subtask] Step failed: {feedback.get('message')}")
+                return False
+            i += 1
         print(f"--- Subtask '{subtask_description}' completed ---")
         return True
 
@@ -163,266 +510,271 @@ Available Tools and their usage {platform_note} (output ONLY a JSON object with
         print(f"\n--- Starting Agent ---")
         print(f"Initial Task: {initial_task}")
         # --- Always capture a screenshot at the start of every task ---
-        screenshot_path = os.path.join(os.path.dirname(__file__), '..', 'logs', 'screens', 'current_screen_step.png')
-        self.screen_capture.capture_screen_bytes(screenshot_path)
-
-        MAX_TOTAL_STEPS = 50
-        total_steps = 0
-        MAX_PLANNING_CYCLES = 3  # New: maximum times to re-plan for the same task
-        planning_cycles = 0
-
-        MAX_PARSE_RETRIES = 3
-        parse_failures = 0
-
-        MAX_ACTION_EXECUTION_RETRIES = 2 # Max retries for a single action within a plan step
-        action_execution_retries = 0
-
-        MAX_STEP_FAILURES = 3  # New: max failures per plan step
-
+        # Runs while the first plan is requested from the LLM and then serves as the first step's observation.
+        # Later steps likewise prefetch the next screenshot while the LLM is busy.
+        self._pending_capture = self._io_pool.submit(self.screen_capture.capture_screen_bytes, self._screenshot_path)
+        self._total_steps = 0
+        self._planning_cycles = 0
+        self._parse_failures = 0
+        self._action_execution_retries = 0
+        self._serial_step = None
+
+        # Each handler runs one step of its state and returns the next status, or None to end the run
         while True:
-            if self.agent_state.get("status") == "completed":
-                print("\n--- Agent finished its task (main loop check). ---")
-                break
-
+            iteration_start = time.perf_counter()
+            self._mark_state_dirty()
             if self.stop_flag:
                 print("\n--- Agent stopped by kill/reset ---")
                 self.agent_state["status"] = "aborted"
                 break
 
-            if total_steps >= MAX_TOTAL_STEPS:
+            if self._total_steps >= MAX_TOTAL_STEPS:
                 print("\n--- Maximum step limit reached. Stopping agent to prevent runaway execution. ---")
                 self.logger.warning("Maximum step limit reached. Stopping agent.")
                 break
 
-            if self.agent_state["status"] == "planning":
-                if self.stop_flag:
-                    self.agent_state["status"] = "aborted"
-                    break
-                if planning_cycles >= MAX_PLANNING_CYCLES:
-                    print("\n--- Maximum planning cycles reached. Aborting task to prevent infinite loop. ---")
-                    self.logger.error("Maximum planning cycles reached. Aborting task.")
-                    self.agent_state["status"] = "aborted"
-                    break
-                planning_cycles += 1
-                print("\n--- Agent Planning ---")
-                current_context = self.global_prompt_manager.get_current_context(self.agent_state)
-                self.agent_state["current_plan"] = self._plan_task(self.agent_state["current_task"], current_context)
-                self.agent_state["plan_step"] = 0
-                action_execution_retries = 0 # Reset retries for new plan
-                total_steps += 1
-
-                if not self.agent_state["current_plan"]:
-                    self.logger.error("Failed to generate a plan. Halting agent.")
-                    print("\n--- AGENT HALTED: Unable to generate a plan. ---")
-                    break
-                else:
-                    self.agent_state["status"] = "executing_plan"
-                    print(f"Agent has a plan with {len(self.agent_state['current_plan'])} steps.")
-
-            elif self.agent_state["status"] == "executing_plan":
-                if self.stop_flag:
-                    self.agent_state["status"] = "aborted"
-                    break
-                if self.agent_state["plan_step"] >= len(self.agent_state["current_plan"]):
-                    print("\n--- All steps in the current plan executed. Agent considering next steps or task completion. ---")
-                    self.agent_state["status"] = "planning"
-                    continue
-                current_step = self.agent_state["current_plan"][self.agent_state["plan_step"]]
-                step_signature = json.dumps(current_step, sort_keys=True)
-
-                # Removed user confirmation for risky actions; proceed automatically
-
-                # 1. Perception/Observation for this step
-                screenshot_path = os.path.join(os.path.dirname(__file__), '..', 'logs', 'screens', 'current_screen_step.png')
-                screen_image_bytes = self.screen_capture.capture_screen_bytes(screenshot_path)
-
-                if self.stop_flag:
-                    self.agent_state["status"] = "aborted"
-                    break
-
-                # Gather user feedback
-                latest_feedback = self.feedback_handler.get_latest_feedback()
-                if latest_feedback:
-                    print(f"\nReceived user feedback: {latest_feedback}")
-                    self.agent_state = self.feedback_handler.process_feedback(self.agent_state, latest_feedback)
-
-                # Construct LLM Prompt for action execution (now it's more about refining the current step)
-                last_action_feedback_str = json.dumps(self.agent_state.get('last_action_feedback', {"status": "none", "message": "No previous action feedback."}))
-
-                llm_response_text = self.call_llm(
-                    self.global_prompt_manager.get_action_execution_prompt(
-                        current_task_description=self.agent_state["current_task"],
-                        current_plan_step=current_step,
-                        last_action_feedback=last_action_feedback_str,
-                        last_read_content=self.agent_state.get('last_read_content'),
-                        last_directory_list=self.agent_state.get('last_directory_list'),
-                        last_retrieved_knowledge=self.agent_state.get('last_retrieved_knowledge'),
-                        history=self.agent_state["history"][-5:],
-                        failed_steps_summary=self.failed_steps,
-                        successful_steps_summary=list(self.successful_steps)
-                    ),
-                    image_data=screen_image_bytes
-                )
-                parsed_action = self.parse_llm_response(llm_response_text)
-
-                if self.stop_flag:
-                    self.agent_state["status"] = "aborted"
-                    break
-
-                if parsed_action.get("action") == "unknown":
-                    parse_failures += 1
-                    self.logger.warning(f"LLM output parsing failed ({parse_failures}/{MAX_PARSE_RETRIES}) for step {self.agent_state['plan_step']}: {parsed_action.get('error')}. Raw LLM: {llm_response_text}")
-                    if parse_failures >= MAX_PARSE_RETRIES:
-                        self.logger.error("Too many LLM output parsing failures for a plan step. Going back to planning.")
-                        self.agent_state["status"] = "planning" # Go back to planning if current step cannot be parsed
-                        parse_failures = 0 # Reset counter
-                        action_execution_retries = 0 # Reset retries for new plan
-                        continue
-                    else:
-                        # Provide explicit feedback to LLM about parsing failure for the next retry on this step
-                        self.agent_state["last_action_feedback"] = {
-                            "status": "failure",
-                            "message": f"LLM response parsing failed. Expected ONLY a single JSON object for action parameters. Error: {parsed_action.get('error', 'Unknown error')}. Please output a valid JSON object matching the action schema for: {current_step.get('action')}."
-                        }
-                        continue # Skip action execution, re-prompt LLM for this step with feedback
-
-                parse_failures = 0 # Reset counter on successful parse
-
-                # 3. Action Execution
-                print(f"\n--- Agent Acting (from plan): {parsed_action['action']} ---")
-                action_result_feedback = self.execute_action(parsed_action) # This now returns a dict
-                print(f"Action Result: {action_result_feedback['status'].upper()} - {action_result_feedback['message']}")
-
-                # --- Fix: If action is 'task_complete' and reflection confirms success, finish ---
-                if parsed_action.get("action") == "task_complete":
-                    # Reflection step
-                    reflection_prompt = self.global_prompt_manager.get_reflection_prompt(
-                        current_task_description=self.agent_state["current_task"],
-                        current_plan_step=current_step,
-                        action_executed=parsed_action,
-                        action_result=action_result_feedback, # Pass structured result
-                        current_context=self.global_prompt_manager.get_current_context(self.agent_state), # Fresh context
-                        history=self.agent_state["history"]
-                    )
-                    print("\n--- Agent Reflecting on Action Outcome ---")
-                    reflection_llm_response = self.call_llm(reflection_prompt, image_data=screen_image_bytes) # Pass screenshot again for reflection
-                    reflection_parsed = self.parse_llm_response(reflection_llm_response)
-                    action_successful_in_reflection = reflection_parsed.get("status") == "success"
-                    reflection_thought = reflection_parsed.get("thought", "No specific reflection thought provided.")
-                    print(f"Agent's Reflection: {reflection_thought}")
-                    if action_successful_in_reflection:
-                        self.logger.info("Agent completed the task. Setting status to 'completed'.")
-                        self.agent_state["status"] = "completed"
-                        break
-                    else:
-                        # If not successful, fallback to normal retry logic
-                        action_execution_retries += 1
-                        self.logger.warning(f"LLM indicated action failure or requested re-evaluation for 'task_complete'. Retries: {action_execution_retries}/{MAX_ACTION_EXECUTION_RETRIES}. LLM reason: {reflection_parsed.get('message', 'No message')}")
-                        if action_execution_retries >= MAX_ACTION_EXECUTION_RETRIES:
-                            self.logger.error("Too many action execution retries for 'task_complete'. Going back to planning to adjust strategy.")
-                            self.agent_state["status"] = "planning"
-                            action_execution_retries = 0
-                            self.agent_state["last_action_feedback"] = {
-                                "status": "failure",
-                                "message": f"'task_complete' repeatedly failed or could not be confirmed. LLM said: {reflection_parsed.get('message', 'No specific reason.')}. Please adjust the plan."
-                            }
-                        else:
-                            self.agent_state["last_action_feedback"] = {
-                                "status": "failure",
-                                "message": f"Previous 'task_complete' failed (LLM reflection). Retrying step. LLM reason: {reflection_parsed.get('message', 'No specific reason.')}",
-                                "details": action_result_feedback['details']
-                            }
-                        continue
-                # --- End fix for task_complete ---
-
-                # 4. Reflection and Confirmation (New Step)
-                # After executing an action, prompt the LLM to reflect on its success
-                reflection_prompt = self.global_prompt_manager.get_reflection_prompt(
-                    current_task_description=self.agent_state["current_task"],
-                    current_plan_step=current_step,
-                    action_executed=parsed_action,
-                    action_result=action_result_feedback, # Pass structured result
-                    current_context=self.global_prompt_manager.get_current_context(self.agent_state), # Fresh context
-                    history=self.agent_state["history"]
-                )
-                print("\n--- Agent Reflecting on Action Outcome ---")
-                reflection_llm_response = self.call_llm(reflection_prompt, image_data=screen_image_bytes) # Pass screenshot again for reflection
-                reflection_parsed = self.parse_llm_response(reflection_llm_response)
-
-                if self.stop_flag:
-                    self.agent_state["status"] = "aborted"
-                    break
-
-                action_successful_in_reflection = reflection_parsed.get("status") == "success"
-                reflection_thought = reflection_parsed.get("thought", "No specific reflection thought provided.")
-
-                print(f"Agent's Reflection: {reflection_thought}")
-
-                if action_successful_in_reflection:
-                    self.logger.info(f"LLM confirmed action success for plan step {self.agent_state['plan_step']}. Moving to next step.")
-                    self.agent_state["plan_step"] += 1 # Move to next step if successful
-                    action_execution_retries = 0 # Reset retries
-                    self.agent_state["last_action_feedback"] = action_result_feedback # Update feedback for next prompt
-                    # --- Fix: If status is now completed, break to stop agent (applies to any action) ---
-                    if self.agent_state.get("status") == "completed":
-                        print("\n--- Agent finished its task (post-reflection, any action). ---")
-                        break
-                    # --- Additional fix: If plan_step is at or beyond end, break unconditionally ---
-                    if self.agent_state["plan_step"] >= len(self.agent_state["current_plan"]):
-                        print("\n--- Agent finished all plan steps. ---")
-                        break
-                else:
-                    action_execution_retries += 1
-                    self.logger.warning(f"LLM indicated action failure or requested re-evaluation for step {self.agent_state['plan_step']}. Retries: {action_execution_retries}/{MAX_ACTION_EXECUTION_RETRIES}. LLM reason: {reflection_parsed.get('message', 'No message')}")
-                    if action_execution_retries >= MAX_ACTION_EXECUTION_RETRIES:
-                        self.logger.error(f"Too many action execution retries for plan step {self.agent_state['plan_step']}. Going back to planning to adjust strategy.")
-                        self.agent_state["status"] = "planning" # Go back to planning if action repeatedly fails or LLM can't confirm
-                        action_execution_retries = 0 # Reset retries
-                        # Provide explicit feedback for re-planning
-                        self.agent_state["last_action_feedback"] = {
-                            "status": "failure",
-                            "message": f"Action '{parsed_action.get('action')}' for plan step '{current_step.get('description', 'N/A')}' repeatedly failed or could not be confirmed. LLM said: {reflection_parsed.get('message', 'No specific reason.')}. Please adjust the plan."
-                        }
-                    else:
-                        # If retrying, LLM needs to know the action failed and its reflection
-                        self.agent_state["last_action_feedback"] = {
-                            "status": "failure",
-                            "message": f"Previous action '{parsed_action.get('action')}' failed (LLM reflection). Retrying step. LLM reason: {reflection_parsed.get('message', 'No specific reason.')}",
-                            "details": action_result_feedback['details']
-                        }
-                        # Do not increment plan_step, remain on current step for retry
-
-            if self.agent_state["status"] == "completed":
-                print("\n--- Agent finished its task. ---")
-                self.self_evaluate_task()  # Automated self-evaluation after task completion
-                # self.agent_state["status"] = "idle"  # Remove this line
+            handler = self._state_handlers.get(self.agent_state["status"])
+            if handler is None:
                 break
-
-            # Small delay to prevent rapid-fire actions and allow observation
-            time.sleep(1)
-
-            if self.stop_flag:
-                self.agent_state["status"] = "aborted"
+            next_status = handler()
+            if next_status is None:
                 break
+            self.agent_state["status"] = next_status
+
+            # Small delay to prevent rapid-fire actions; LLM round trips usually exceed it already
+            elapsed = time.perf_counter() - iteration_start
+            if elapsed < MIN_ITERATION_SECONDS:
+                time.sleep(MIN_ITERATION_SECONDS - elapsed)
+        # The final state is written before returning; the saver thread is a daemon and may not get another turn
+        self.flush_state()
+
+    def _handle_planning(self) -> str | None:
+        """Starts a (streamed) plan for the current task."""
+        if self._planning_cycles >= MAX_PLANNING_CYCLES:
+            print("\n--- Maximum planning cycles reached. Aborting task to prevent infinite loop. ---")
+            self.logger.error("Maximum planning cycles reached. Aborting task.")
+            return "aborted"
+        self._planning_cycles += 1
+        self._speculation = None  # Made for a step of the plan being replaced
+        print("\n--- Agent Planning ---")
+        self._prefetch_capture()  # The first step's observation is taken while the plan is requested
+        current_context = self.global_prompt_manager.get_current_context(self.agent_state)
+        # Execution starts as soon as the first step has streamed in; later steps keep arriving meanwhile
+        self._plan_stream = self._start_plan_stream(self.agent_state["current_task"], current_context)
+        self.agent_state["current_plan"] = self._plan_stream.steps
+        self.agent_state["plan_step"] = 0
+        self._action_execution_retries = 0 # Reset retries for new plan
+        self._total_steps += 1
+
+        if not self._plan_stream.wait_for(0):
+            self.logger.error("Failed to generate a plan. Halting agent.")
+            print("\n--- AGENT HALTED: Unable to generate a plan. ---")
+            return "idle"  # Set to idle so user can retry
+        print(f"Agent has a plan with {len(self.agent_state['current_plan'])} steps{'' if self._plan_stream.done else ' so far'}.")
+        return "executing_plan"
+
+    def _handle_executing_plan(self) -> str | None:
+        """Observes, asks the LLM for the current plan step's action, executes it and reflects on the outcome."""
+        if not self._plan_has_step(self.agent_state["plan_step"]):
+            print("\n--- All steps in the current plan executed. Agent considering next steps or task completion. ---")
+            return "planning"
+        current_step = self.agent_state["current_plan"][self.agent_state["plan_step"]]
+
+        # Removed user confirmation for risky actions; proceed automatically
+
+        # 1. Perception/Observation for this step
+        if self._pending_capture is not None:
+            screen_image_bytes = self._pending_capture.result()
+            self._pending_capture = None
+        else:
+            screen_image_bytes = self.screen_capture.capture_screen_bytes(self._screenshot_path)
+
+        # Gather user feedback
+        latest_feedback = self.feedback_handler.get_latest_feedback()
+        if latest_feedback:
+            print(f"\nReceived user feedback: {latest_feedback}")
+            self.agent_state = self.feedback_handler.process_feedback(self.agent_state, latest_feedback)
+
+        # The planner may already have given the exact first action; then the action LLM call is skipped
+        first_action = None if latest_feedback else self._take_first_action(current_step)
+        if first_action is None and not latest_feedback and self._speculation is None and self.agent_state["plan_step"] != self._serial_step:
+            independent_steps = self._independent_steps()
+            if len(independent_steps) > 1:
+                return self._execute_independent_steps(independent_steps, screen_image_bytes)
+        if first_action is not None:
+            parsed_action = first_action
+            llm_response_text = json_utils.dumps(first_action)
+        else:
+            # Construct LLM Prompt for action execution (now it's more about refining the current step)
+            action_prompt = self._action_prompt(current_step)
+            llm_response_text = None if latest_feedback else self._take_speculation(action_prompt, screen_image_bytes)
+            if llm_response_text is None:
+                llm_response_text = self.call_llm(action_prompt, image_data=screen_image_bytes, static_prefix=self._action_static_prefix())
+            parsed_action = self.parse_llm_response(llm_response_text)
+
+        # A kill/reset during the LLM call must not let the chosen action run
+        if self.stop_flag:
+            return "aborted"
+
+        if parsed_action.get("action") == "unknown":
+            self._prefetch_capture()  # Nothing ran, so the retry's observation can be taken right away
+            self._parse_failures += 1
+            self.logger.warning("LLM output parsing failed (%s/%s) for step %s: %s. Raw LLM: %s", self._parse_failures, MAX_PARSE_RETRIES, self.agent_state['plan_step'], parsed_action.get('error'), llm_response_text)
+            if self._parse_failures >= MAX_PARSE_RETRIES:
+                self.logger.error("Too many LLM output parsing failures for a plan step. Going back to planning.")
+                self._parse_failures = 0 # Reset counter
+                self._action_execution_retries = 0 # Reset retries for new plan
+                return "planning" # Go back to planning if current step cannot be parsed
+            # Provide explicit feedback to LLM about parsing failure for the next retry on this step
+            self.agent_state["last_action_feedback"] = {
+                "status": "failure",
+                "message": f"LLM response parsing failed. Expected ONLY a single JSON object for action parameters. Error: {parsed_action.get('error', 'Unknown error')}. Please output a valid JSON object matching the action schema for: {current_step.get('action')}."
+            }
+            return "executing_plan" # Skip action execution, re-prompt LLM for this step with feedback
+
+        self._parse_failures = 0 # Reset counter on successful parse
+
+        # 3. Action Execution
+        print(f"\n--- Agent Acting (from plan): {parsed_action['action']} ---")
+        action_result_feedback = self.execute_action(parsed_action) # This now returns a dict
+        print(f"Action Result: {action_result_feedback['status'].upper()} - {action_result_feedback['message']}")
+        if parsed_action.get("action") in NON_VISUAL_ACTIONS and not parsed_action.get("background"):
+            # The screen has nothing to settle after this action; capture the next observation during reflection
+            self._prefetch_capture()
+
+        # --- Fix: If action is 'task_complete' and reflection confirms success, finish ---
+        if parsed_action.get("action") == "task_complete":
+            # Reflection step
+            reflection_prompt = self.global_prompt_manager.get_reflection_prompt(
+                current_task_description=self.agent_state["current_task"],
+                current_plan_step=current_step,
+                action_executed=parsed_action,
+                action_result=action_result_feedback, # Pass structured result
+                current_context=self.global_prompt_manager.get_current_context(self.agent_state), # Fresh context
+                history=self.agent_state["history"]
+            )
+            print("\n--- Agent Reflecting on Action Outcome ---")
+            reflection_llm_response = self.call_llm(reflection_prompt, image_data=screen_image_bytes) # Pass screenshot again for reflection
+            reflection_parsed = self.parse_llm_response(reflection_llm_response)
+            action_successful_in_reflection = reflection_parsed.get("status") == "success"
+            reflection_thought = reflection_parsed.get("thought", "No specific reflection thought provided.")
+            print(f"Agent's Reflection: {reflection_thought}")
+            if action_successful_in_reflection:
+                self.logger.info("Agent completed the task. Setting status to 'completed'.")
+                self.agent_state["status"] = "completed"
+                return None
+            self._prefetch_capture()
+            # If not successful, fallback to normal retry logic
+            self._action_execution_retries += 1
+            self.logger.warning("LLM indicated action failure or requested re-evaluation for 'task_complete'. Retries: %s/%s. LLM reason: %s", self._action_execution_retries, MAX_ACTION_EXECUTION_RETRIES, reflection_parsed.get('message', 'No message'))
+            if self._action_execution_retries >= MAX_ACTION_EXECUTION_RETRIES:
+                self.logger.error("Too many action execution retries for 'task_complete'. Going back to planning to adjust strategy.")
+                self._action_execution_retries = 0
+                self.agent_state["last_action_feedback"] = {
+                    "status": "failure",
+                    "message": f"'task_complete' repeatedly failed or could not be confirmed. LLM said: {reflection_parsed.get('message', 'No specific reason.')}. Please adjust the plan."
+                }
+                return "planning"
+            self.agent_state["last_action_feedback"] = {
+                "status": "failure",
+                "message": f"Previous 'task_complete' failed (LLM reflection). Retrying step. LLM reason: {reflection_parsed.get('message', 'No specific reason.')}",
+                "details": action_result_feedback['details']
+            }
+            return "executing_plan"
+        # --- End fix for task_complete ---
+
+        # 4. Reflection and Confirmation (New Step)
+        # After executing an action, prompt the LLM to reflect on its success
+        if parsed_action.get("action") in SELF_VERIFYING_ACTIONS and action_result_feedback["status"] == "success":
+            # The executor already confirmed the outcome; skip the second LLM round trip
+            reflection_parsed = {"status": "success", "thought": f"Executor confirmed: {action_result_feedback['message']}"}
+        else:
+            reflection_prompt = self.global_prompt_manager.get_reflection_prompt(
+                current_task_description=self.agent_state["current_task"],
+                current_plan_step=current_step,
+                action_executed=parsed_action,
+                action_result=action_result_feedback, # Pass structured result
+                current_context=self.global_prompt_manager.get_current_context(self.agent_state), # Fresh context
+                history=self.agent_state["history"]
+            )
+            print("\n--- Agent Reflecting on Action Outcome ---")
+            if parsed_action.get("action") in NON_VISUAL_ACTIONS and not parsed_action.get("background"):
+                reflection_image = None  # Skip re-uploading a screenshot that carries no signal for this action
+                if SPECULATE_NEXT_ACTION:
+                    # The next observation is already being captured, so the next step's action call can overlap the reflection
+                    self._speculate_next_action(action_result_feedback)
+            else:
+                reflection_image = screen_image_bytes # Pass screenshot again for reflection
+            reflection_llm_response = self.call_llm(reflection_prompt, image_data=reflection_image)
+            reflection_parsed = self.parse_llm_response(reflection_llm_response)
+        # GUI actions get the reflection round trip to settle before the next observation is taken
+        self._prefetch_capture()
+
+        action_successful_in_reflection = reflection_parsed.get("status") == "success"
+        reflection_thought = reflection_parsed.get("thought", "No specific reflection thought provided.")
+
+        print(f"Agent's Reflection: {reflection_thought}")
+
+        if action_successful_in_reflection:
+            self.logger.info("LLM confirmed action success for plan step %s. Moving to next step.", self.agent_state['plan_step'])
+            self.agent_state["plan_step"] += 1 # Move to next step if successful
+            self._action_execution_retries = 0 # Reset retries
+            self.agent_state["last_action_feedback"] = action_result_feedback # Update feedback for next prompt
+            # --- Fix: If status is now completed, stop the agent (applies to any action) ---
+            if self.agent_state.get("status") == "completed":
+                print("\n--- Agent finished its task (post-reflection, any action). ---")
+                return None
+            # --- Additional fix: If plan_step is at or beyond end, stop unconditionally ---
+            if not self._plan_has_step(self.agent_state["plan_step"]):
+                print("\n--- Agent finished all plan steps. ---")
+                return None
+            return self.agent_state["status"]
+
+        self._action_execution_retries += 1
+        self._speculation = None  # Assumed this step succeeded
+        self.logger.warning("LLM indicated action failure or requested re-evaluation for step %s. Retries: %s/%s. LLM reason: %s", self.agent_state['plan_step'], self._action_execution_retries, MAX_ACTION_EXECUTION_RETRIES, reflection_parsed.get('message', 'No message'))
+        if self._action_execution_retries >= MAX_ACTION_EXECUTION_RETRIES:
+            self.logger.error("Too many action execution retries for plan step %s. Going back to planning to adjust strategy.", self.agent_state['plan_step'])
+            self._action_execution_retries = 0 # Reset retries
+            # Provide explicit feedback for re-planning
+            self.agent_state["last_action_feedback"] = {
+                "status": "failure",
+                "message": f"Action '{parsed_action.get('action')}' for plan step '{current_step.get('description', 'N/A')}' repeatedly failed or could not be confirmed. LLM said: {reflection_parsed.get('message', 'No specific reason.')}. Please adjust the plan."
+            }
+            return "planning" # Go back to planning if action repeatedly fails or LLM can't confirm
+        # If retrying, LLM needs to know the action failed and its reflection
+        self.agent_state["last_action_feedback"] = {
+            "status": "failure",
+            "message": f"Previous action '{parsed_action.get('action')}' failed (LLM reflection). Retrying step. LLM reason: {reflection_parsed.get('message', 'No specific reason.')}",
+            "details": action_result_feedback['details']
+        }
+        # Do not increment plan_step, remain on current step for retry
+        return self.agent_state["status"]
+
+    def _handle_completed(self) -> None:
+        print("\n--- Agent finished its task. ---")
+        self.self_evaluate_task()  # Automated self-evaluation after task completion
+        return None
 
     def self_evaluate_task(self):
         """Prompts the LLM to critique the agent's overall performance after task completion."""
         evaluation_prompt = self.global_prompt_manager.get_self_evaluation_prompt(
             current_task=self.agent_state["current_task"],
             history=self.agent_state["history"],
-            final_state=self.agent_state
+            # The prompt already lists the recent history; dumping the whole deque again only adds tokens
+            final_state={k: v for k, v in self.agent_state.items() if k != "history"}
         )
         self.logger.info("Agent performing self-evaluation of completed task.")
         llm_response = self.call_llm(evaluation_prompt)
         try:
-            evaluation = json.loads(llm_response)
+            evaluation = json_utils.loads(llm_response)
         except Exception:
             evaluation = {"raw_response": llm_response}
-        self.logger.info(f"Self-evaluation: {evaluation}")
+        self.logger.info("Self-evaluation: %s", evaluation)
         # Store in knowledge base for future reference
         self.knowledge_base.store_knowledge(
             key=f"self_evaluation_{int(time.time())}",
-            value=json.dumps(evaluation)
+            value=json_utils.dumps(evaluation)
         )
         print(f"\n--- Agent Self-Evaluation ---\n{evaluation}\n")
 
@@ -431,49 +783,50 @@ if __name__ == "__main__":
     # Placeholder for your actual LLM client setup
     # from google.generativeai import GenerativeModel # pip install google-generativeai
     # gemini_llm_client = GenerativeModel('gemini-pro-vision') # For multimodal
+    from .llm.response import LLMResponse
 
     class MockLLMClient: # Mock LLM client for demonstration
         def generate_content(self, contents, generation_config):
-            prompt = contents[0]
+            prompt = "".join(part for part in contents if isinstance(part, str))
             if "PLANNING_PROMPT" in prompt:
                 print("Mock LLM: Planning phase...")
                 # Example plan for the initial task
-                return type('obj', (object,), {'text' : json.dumps({"plan": [
+                return LLMResponse(text=json.dumps({"plan": [
                     {"action": "list_directory", "description": "See what files are in the current directory."},
                     {"action": "write_file", "file": "ai_notes.txt", "content": "My first AI note.", "description": "Create the new file with content."},
                     {"action": "read_file", "file": "ai_notes.txt", "description": "Verify the file content."},
                     {"action": "task_complete", "description": "Task is done."}
-                ]})})
+                ]}))
             elif "ACTION_EXECUTION_PROMPT" in prompt:
                 print("Mock LLM: Action execution phase...")
                 if "list_directory" in prompt:
-                    return type('obj', (object,), {'text' : json.dumps({"action": "list_directory", "path": "."})})
+                    return LLMResponse(text=json.dumps({"action": "list_directory", "path": "."}))
                 elif "write_file" in prompt:
-                    return type('obj', (object,), {'text' : json.dumps({"action": "write_file", "file": "ai_notes.txt", "content": "My first AI note."})})
+                    return LLMResponse(text=json.dumps({"action": "write_file", "file": "ai_notes.txt", "content": "My first AI note."}))
                 elif "read_file" in prompt:
-                    return type('obj', (object,), {'text' : json.dumps({"action": "read_file", "file": "ai_notes.txt"})})
+                    return LLMResponse(text=json.dumps({"action": "read_file", "file": "ai_notes.txt"}))
                 elif "task_complete" in prompt:
-                    return type('obj', (object,), {'text' : json.dumps({"action": "task_complete"})})
+                    return LLMResponse(text=json.dumps({"action": "task_complete"}))
                 else:
-                    return type('obj', (object,), {'text' : json.dumps({"action": "unknown", "error": "Mock LLM didn't understand action."})})
+                    return LLMResponse(text=json.dumps({"action": "unknown", "error": "Mock LLM didn't understand action."}))
             elif "REFLECTION_PROMPT" in prompt:
                 print("Mock LLM: Reflection phase...")
                 # Simulate success for all actions in this mock
                 if '"status": "failure"' in prompt: # If previous action was reported as failure
                      # Simulate reflection recommending re-attempt or re-plan if needed
-                    return type('obj', (object,), {'text' : json.dumps({
+                    return LLMResponse(text=json.dumps({
                         "status": "failure",
                         "thought": "The previous action failed. I will try to adjust my approach or re-attempt it.",
                         "message": "Action verification failed or adjustment needed."
-                    })})
+                    }))
                 else:
-                    return type('obj', (object,), {'text' : json.dumps({
+                    return LLMResponse(text=json.dumps({
                         "status": "success",
                         "thought": "The action seems to have completed successfully. Moving to the next step.",
                         "message": "Action verified as successful."
-                    })})
+                    }))
             else:
-                return type('obj', (object,), {'text' : json.dumps({"action": "unknown", "error": "Mock LLM didn't understand prompt type."})})
+                return LLMResponse(text=json.dumps({"action": "unknown", "error": "Mock LLM didn't understand prompt type."}))
 
 
     agent = AgentCore(llm_client=MockLLMClient()) # Pass your actual LLM client here
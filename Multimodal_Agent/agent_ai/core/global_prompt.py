@@ -20,9 +20,18 @@ class GlobalPrompt:
     def get_planning_prompt(self, *args, **kwargs):
         return self.planning.get_planning_prompt(*args, **kwargs)
 
+    def get_planning_static_prefix(self, *args, **kwargs):
+        return self.planning.get_static_prefix(*args, **kwargs)
+
+    def get_batch_planning_prompt(self, *args, **kwargs):
+        return self.planning.get_batch_planning_prompt(*args, **kwargs)
+
     def get_action_execution_prompt(self, *args, **kwargs):
         return self.action.get_action_execution_prompt(*args, **kwargs)
 
+    def get_action_static_prefix(self, *args, **kwargs):
+        return self.action.get_static_prefix(*args, **kwargs)
+
     def get_reflection_prompt(self, *args, **kwargs):
         return self.reflection.get_reflection_prompt(*args, **kwargs)
 
@@ -0,0 +1,51 @@
+"""
+On-disk cache of LLM response texts, keyed by a SHA-256 hash of the prompt and image.
+"""
+import hashlib
+import os
+import tempfile
+import time
+from ...utils import json_utils
+
+# Bump when prompt templates change in a way that should invalidate cached responses
+PROMPT_VERSION = 1
+CACHE_TTL_SECONDS = 7 * 24 * 3600
+
+class LLMResponseCache:
+    """File-per-entry cache: <cache_dir>/<inputHash>.json holding inputHash, promptVersion, expiresAt and response."""
+    def __init__(self, cache_dir: str, ttl: float = CACHE_TTL_SECONDS, prompt_version: int = PROMPT_VERSION):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.prompt_version = prompt_version
+        self.stats = {"hits": 0, "misses": 0}
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def key(self, prompt: str, image_data: bytes | None, temperature: float) -> str:
+        digest = hashlib.sha256(prompt.encode())
+        if image_data:
+            digest.update(hashlib.sha256(image_data).digest())
+        digest.update(f"|{temperature}|{self.prompt_version}".encode())
+        return digest.hexdigest()
+
+    def get(self, key: str) -> str | None:
+        try:
+            with open(os.path.join(self.cache_dir, key + ".json"), "rb") as f:
+                entry = json_utils.loads(f.read())
+        except (OSError, ValueError):
+            entry = None
+        if entry is None or entry.get("promptVersion") != self.prompt_version or entry.get("expiresAt", 0) < time.time():
+            self.stats["misses"] += 1
+            return None
+        self.stats["hits"] += 1
+        return entry.get("response")
+
+    def put(self, key: str, response: str):
+        entry = {"inputHash": key, "promptVersion": self.prompt_version, "expiresAt": time.time() + self.ttl, "response": response}
+        try:
+            # Write then rename so a concurrent reader never sees a partial file
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(json_utils.dumps(entry))
+            os.replace(tmp_path, os.path.join(self.cache_dir, key + ".json"))
+        except OSError:
+            pass  # Caching is best effort
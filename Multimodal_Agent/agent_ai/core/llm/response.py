@@ -0,0 +1,9 @@
+"""
+Minimal response object for LLM client wrappers that do not return a Gemini-style response.
+"""
+from dataclasses import dataclass
+
+@dataclass(slots=True)
+class LLMResponse:
+    """Holds the generated text under .text, like the Gemini response objects LLMInterface reads."""
+    text: str
@@ -1,6 +1,7 @@
 import json
 import os
 import importlib
+from .response import LLMResponse
 
 class LLMSelector:
     def __init__(self, config_path=None):
@@ -28,26 +29,41 @@ class LLMSelector:
             openai = importlib.import_module('openai')
             class OpenAIClient:
                 def generate_content(self, contents, generation_config=None):
-                    prompt = contents[0] if isinstance(contents, list) else contents
+                    # Text parts are joined; a static leading part stays byte-identical, so automatic prefix caching applies
+                    prompt = "".join(part for part in contents if isinstance(part, str)) if isinstance(contents, list) else contents
+                    # JSON mode, when the caller asks for JSON-only output
+                    json_mode = (generation_config or {}).get("response_mime_type") == "application/json"
                     response = openai.ChatCompletion.create(
                         model=model,
                         messages=[{"role": "user", "content": prompt}],
-                        api_key=api_key
+                        api_key=api_key,
+                        **({"response_format": {"type": "json_object"}} if json_mode else {})
                     )
-                    return type('obj', (object,), {'text': response['choices'][0]['message']['content']})
+                    return LLMResponse(text=response['choices'][0]['message']['content'])
             return OpenAIClient()
         elif provider == 'anthropic':
             anthropic = importlib.import_module('anthropic')
+            # One client for the whole session so every call reuses its pooled keep-alive connections
+            client = anthropic.Anthropic(api_key=api_key)
             class AnthropicClient:
                 def generate_content(self, contents, generation_config=None):
-                    prompt = contents[0] if isinstance(contents, list) else contents
-                    client = anthropic.Anthropic(api_key=api_key)
+                    texts = [part for part in contents if isinstance(part, str)] if isinstance(contents, list) else [contents]
+                    content = [{"type": "text", "text": text} for text in texts]
+                    if len(content) > 1:
+                        # The leading part is the prompt's static prefix; cache it so later calls skip its prefill
+                        content[0]["cache_control"] = {"type": "ephemeral"}
+                    messages = [{"role": "user", "content": content}]
+                    # No JSON mode here; prefilling the opening brace makes the reply the rest of a JSON object
+                    json_mode = (generation_config or {}).get("response_mime_type") == "application/json"
+                    if json_mode:
+                        messages.append({"role": "assistant", "content": "{"})
                     response = client.messages.create(
                         model=model,
                         max_tokens=1024,
-                        messages=[{"role": "user", "content": prompt}]
+                        messages=messages
                     )
-                    return type('obj', (object,), {'text': response.content[0].text})
+                    text = response.content[0].text
+                    return LLMResponse(text="{" + text if json_mode else text)
             return AnthropicClient()
         else:
             raise ValueError(f"Unknown provider: {provider}")
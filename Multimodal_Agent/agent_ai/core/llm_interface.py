@@ -1,70 +1,336 @@
 """
 LLMInterface class for handling LLM calls and response parsing.
 """
+import asyncio
+import inspect
 import json
-import io
+import logging
+import os
+import re
+import time
 import datetime
-from PIL import Image
+import threading
+from collections import deque
+from ..utils.history import recent_history
+from ..utils import json_utils
+from .llm.cache import LLMResponseCache
+
+# One case-insensitive pass over the error text instead of lowercasing it once per keyword
+_RATE_LIMIT_RE = re.compile(r"quota|rate limit|429|exceeded|too many requests", re.IGNORECASE)
+
+# Provider requests-per-minute limit enforced client-side; 0 disables throttling
+LLM_MAX_CALLS_PER_MINUTE = int(os.environ.get("LLM_MAX_CALLS_PER_MINUTE", "0"))
+
+# Sampling temperature of every LLM call
+LLM_TEMPERATURE = float(os.environ.get("LLM_TEMPERATURE", "0.7"))
+
+# Every agent prompt expects a single JSON object, so providers can be asked for JSON-only output (LLM_JSON_MODE=1 enables).
+# Opt-in because older Gemini models reject response_mime_type; responses are parsed leniently either way
+LLM_JSON_MODE = os.environ.get("LLM_JSON_MODE", "0") == "1"
+GENERATION_CONFIG = {"temperature": LLM_TEMPERATURE, **({"response_mime_type": "application/json"} if LLM_JSON_MODE else {})}
+
+# Response caching is on for deterministic sampling (temperature <= 0) or when LLM_CACHE=1
+LLM_CACHE_ENABLED = LLM_TEMPERATURE <= 0 or os.environ.get("LLM_CACHE") == "1"
+LLM_CACHE_DIR = os.environ.get("LLM_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".agent_cache"))
+
+# Maximum LLM requests acall_llm_many keeps in flight at once
+LLM_MAX_CONCURRENCY = max(1, int(os.environ.get("LLM_MAX_CONCURRENCY", "4")))
+
+_PLAN_ARRAY_RE = re.compile(r'"plan"\s*:\s*\[')
+
+def iter_plan_steps(chunks):
+    """Yields each object of a response's top-level "plan" array as soon as its closing brace has arrived.
+
+    chunks is any iterable of text fragments, e.g. from LLMInterface.stream_llm. Iteration stops at the end of the array.
+    """
+    buf = ""
+    pos = None  # Next character to scan, once the array has been found
+    depth = 0
+    start = None
+    in_string = escape = False
+    for chunk in chunks:
+        buf += chunk
+        if pos is None:
+            match = _PLAN_ARRAY_RE.search(buf)
+            if not match:
+                continue
+            pos = match.end()
+        while pos < len(buf):
+            ch = buf[pos]
+            if in_string:
+                if escape:
+                    escape = False
+                elif ch == "\\":
+                    escape = True
+                elif ch == '"':
+                    in_string = False
+            elif ch == '"':
+                in_string = True
+            elif ch in "{[":
+                if depth == 0:
+                    start = pos
+                depth += 1
+            elif ch in "}]":
+                if depth == 0:
+                    return  # End of the plan array
+                depth -= 1
+                if depth == 0:
+                    try:
+                        yield json_utils.loads(buf[start:pos + 1])
+                    except ValueError:
+                        pass
+            pos += 1
+
+def default_response_cache() -> LLMResponseCache | None:
+    """The response cache configured by the LLM_CACHE* / LLM_TEMPERATURE environment variables, or None when caching is off."""
+    return LLMResponseCache(LLM_CACHE_DIR) if LLM_CACHE_ENABLED else None
+
+# Leading bytes of the image formats screen_capture produces
+_IMAGE_SIGNATURES = ((b"\xff\xd8\xff", "image/jpeg"), (b"\x89PNG\r\n\x1a\n", "image/png"))
+
+def _image_mime_type(data: bytes) -> str | None:
+    for signature, mime_type in _IMAGE_SIGNATURES:
+        if data.startswith(signature):
+            return mime_type
+    return None
+
+_JSON_DECODER = json.JSONDecoder()
+
+def first_json_object(text: str, start: int = 0) -> dict:
+    """Returns the first complete JSON object in text at or after start, ignoring surrounding prose or code fences.
+
+    Raises json.JSONDecodeError when no object parses.
+    """
+    start = text.find('{', start)
+    end = len(text.rstrip())
+    if start != -1 and text.endswith('}', 0, end):
+        try:
+            return json_utils.loads(text[start:end])  # Common case: the response is just the object
+        except ValueError:
+            pass
+    error = None
+    while start != -1:
+        try:
+            return _JSON_DECODER.raw_decode(text, start)[0]
+        except json.JSONDecodeError as e:
+            error = error or e
+            # Braces before the failure point belong to the broken object; resume after it
+            start = text.find('{', max(start + 1, e.pos))
+    raise error or json.JSONDecodeError("No JSON object found", text, 0)
+
+_FIRST_ACTION_RE = re.compile(r'"first_action"\s*:\s*')
+
+def extract_first_action(text: str) -> dict | None:
+    """Returns the "first_action" object of a (possibly still incomplete) plan response, or None if it is absent or not complete yet."""
+    match = _FIRST_ACTION_RE.search(text)
+    if not match:
+        return None
+    try:
+        first_action, _ = _JSON_DECODER.raw_decode(text, match.end())
+    except json.JSONDecodeError:
+        return None
+    return first_action if isinstance(first_action, dict) and first_action.get("action") else None
+
+def _accepts_stream(client) -> bool:
+    try:
+        return "stream" in inspect.signature(client.generate_content).parameters
+    except (AttributeError, TypeError, ValueError):
+        return False
 
 class LLMInterface:
     llm_call_count = 0
-    llm_call_timestamps = []
+    llm_call_timestamps = deque(maxlen=60)
+    _rpm_window = deque()  # Monotonic start times of calls in the last minute
+    _rpm_lock = threading.Lock()
 
-    def __init__(self, llm_client, logger):
+    def __init__(self, llm_client, logger, cache: LLMResponseCache | None = None, max_calls_per_minute: int | None = None, max_concurrency: int | None = None):
         self.llm_client = llm_client
         self.logger = logger
-        self.last_screenshot_pil = None
+        self.cache = cache
+        # Default to the LLM_MAX_CALLS_PER_MINUTE / LLM_MAX_CONCURRENCY environment settings
+        self.max_calls_per_minute = LLM_MAX_CALLS_PER_MINUTE if max_calls_per_minute is None else max_calls_per_minute
+        self.max_concurrency = LLM_MAX_CONCURRENCY if max_concurrency is None else max(1, max_concurrency)
+        self._can_stream = _accepts_stream(llm_client)
 
-    def call_llm(self, prompt: str, image_data: bytes | None = None) -> str:
+    def call_llm(self, prompt: str, image_data: bytes | None = None, static_prefix: str | None = None) -> str:
+        """static_prefix, when prompt starts with it, is sent as a separate leading part that providers can cache."""
         if self.llm_client is None:
             self.logger.error("LLM client is not configured. Cannot make API call.")
-            return json.dumps({"action": "unknown", "error": "LLM not configured"})
+            return json_utils.dumps({"action": "unknown", "error": "LLM not configured"})
+        key, cached = self._cache_lookup(prompt, image_data)
+        if cached is not None:
+            return cached
         try:
-            contents = [prompt]
-            if image_data:
-                try:
-                    pil_image = Image.open(io.BytesIO(image_data))
-                    contents.append(pil_image)
-                    self.last_screenshot_pil = pil_image
-                except Exception as img_e:
-                    self.logger.error(f"Error converting image data to PIL Image: {img_e}")
-            self.logger.info(f"Sending prompt to LLM (first 500 chars): {prompt[:500]}...")
-            if image_data:
-                self.logger.info("Image data included in LLM call.")
-            # --- LLM call diagnostics ---
-            LLMInterface.llm_call_count += 1
-            now = datetime.datetime.now()
-            LLMInterface.llm_call_timestamps.append(now)
-            self.logger.info(f"LLM CALL #{LLMInterface.llm_call_count} at {now.strftime('%Y-%m-%d %H:%M:%S')}")
-            if len(LLMInterface.llm_call_timestamps) > 1:
-                recent = LLMInterface.llm_call_timestamps[-5:]
-                self.logger.info(f"Last 5 LLM call times: {[t.strftime('%H:%M:%S') for t in recent]}")
-            # --- END diagnostics ---
+            delay = self._rate_limit_delay()
+            if delay:
+                time.sleep(delay)
+            contents = self._prepare_call(prompt, image_data, static_prefix)
+            response = self.llm_client.generate_content(
+                contents=contents,
+                generation_config=GENERATION_CONFIG
+            )
+            return self._response_text(response, key)
+        except Exception as e:
+            return self._error_response(e)
+
+    async def acall_llm(self, prompt: str, image_data: bytes | None = None, static_prefix: str | None = None) -> str:
+        """Async variant of call_llm, so independent work can overlap the LLM round trip.
+
+        Uses the client's native generate_content_async when it has one, otherwise runs call_llm in a worker thread.
+        """
+        generate_async = getattr(self.llm_client, "generate_content_async", None)
+        if generate_async is None:
+            return await asyncio.to_thread(self.call_llm, prompt, image_data, static_prefix)
+        key, cached = self._cache_lookup(prompt, image_data)
+        if cached is not None:
+            return cached
+        try:
+            delay = self._rate_limit_delay()
+            if delay:
+                await asyncio.sleep(delay)
+            contents = self._prepare_call(prompt, image_data, static_prefix)
+            response = await generate_async(
+                contents=contents,
+                generation_config=GENERATION_CONFIG
+            )
+            return self._response_text(response, key)
+        except Exception as e:
+            return self._error_response(e)
+
+    async def acall_llm_many(self, prompts: list[str], image_data: bytes | None = None, static_prefix: str | None = None) -> list[str]:
+        """Runs independent LLM calls concurrently, at most max_concurrency at a time; results keep the order of prompts.
+
+        image_data and static_prefix, when given, apply to every prompt.
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        async def limited(prompt):
+            async with semaphore:
+                return await self.acall_llm(prompt, image_data, static_prefix)
+        return await asyncio.gather(*(limited(prompt) for prompt in prompts))
+
+    def stream_llm(self, prompt: str, image_data: bytes | None = None, static_prefix: str | None = None):
+        """Yields the LLM response text chunk by chunk as it arrives.
+
+        Clients without streaming support yield the whole call_llm result as a single chunk.
+        A failure before any text arrived yields the usual error JSON; a failure midway raises instead,
+        since the error object would otherwise read as the continuation of the partial response.
+        """
+        if not self._can_stream:
+            yield self.call_llm(prompt, image_data, static_prefix)
+            return
+        key, cached = self._cache_lookup(prompt, image_data)
+        if cached is not None:
+            yield cached
+            return
+        texts = []
+        try:
+            delay = self._rate_limit_delay()
+            if delay:
+                time.sleep(delay)
+            contents = self._prepare_call(prompt, image_data, static_prefix)
             response = self.llm_client.generate_content(
                 contents=contents,
-                generation_config={"temperature": 0.7}
+                generation_config=GENERATION_CONFIG,
+                stream=True
             )
-            if not hasattr(response, 'text') or not response.text:
-                self.logger.error("LLM returned empty or malformed response object.")
-                return json.dumps({"action": "unknown", "error": "LLM returned empty response"})
-            self.logger.info(f"Received LLM response (first 200 chars): {response.text[:200]}...")
-            return response.text
+            for chunk in response:
+                try:
+                    text = getattr(chunk, "text", None)
+                except ValueError:
+                    # Gemini raises on .text for chunks without parts (e.g. a final finish_reason-only chunk)
+                    continue
+                if text:
+                    texts.append(text)
+                    yield text
+            if key is not None and texts:
+                self.cache.put(key, "".join(texts))
         except Exception as e:
-            error_str = str(e)
-            if any(keyword in error_str.lower() for keyword in ["quota", "rate limit", "429", "exceeded", "too many requests"]):
-                self.logger.error(f"LLM quota/rate limit error: {e}", exc_info=True)
-                return json.dumps({"action": "unknown", "error": f"LLM quota/rate limit error: {e}"})
+            error_response = self._error_response(e)
+            if texts:
+                raise
+            yield error_response
+
+    def _rate_limit_delay(self) -> float:
+        """Reserves a slot under max_calls_per_minute and returns how long to wait before using it."""
+        limit = self.max_calls_per_minute
+        if limit <= 0:
+            return 0.0
+        with LLMInterface._rpm_lock:
+            window = LLMInterface._rpm_window
+            now = time.monotonic()
+            while window and now - window[0] >= 60:
+                window.popleft()
+            delay = 0.0
+            if len(window) >= limit:
+                delay = 60 - (now - window[-limit])
+            window.append(now + delay)
+        if delay:
+            self.logger.info("LLM rate limit of %s/min reached; waiting %.1fs.", limit, delay)
+        return delay
+
+    def _prepare_call(self, prompt: str, image_data: bytes | None, static_prefix: str | None = None) -> list:
+        """Builds the request contents and records call diagnostics."""
+        if static_prefix and len(prompt) > len(static_prefix) and prompt.startswith(static_prefix):
+            # Text parts are concatenated by the provider; the separate leading part lets client wrappers mark it for caching
+            contents = [static_prefix, prompt[len(static_prefix):]]
+        else:
+            contents = [prompt]
+        if image_data:
+            # Send the already compressed bytes as an inline blob; a PIL image would be decoded and re-encoded by the client
+            mime_type = _image_mime_type(image_data)
+            if mime_type:
+                contents.append({"mime_type": mime_type, "data": image_data})
             else:
-                self.logger.error(f"Error calling LLM API: {e}", exc_info=True)
-                return json.dumps({"action": "unknown", "error": f"LLM API error: {e}"})
+                self.logger.error("Unrecognized image data format; sending the prompt without the image.")
+        # --- LLM call diagnostics ---
+        LLMInterface.llm_call_count += 1
+        now = datetime.datetime.now()
+        LLMInterface.llm_call_timestamps.append(now)
+        if self.logger.isEnabledFor(logging.INFO):  # Skip the slicing and time formatting when INFO is filtered out
+            self.logger.info("Sending prompt to LLM (first 500 chars): %s...", prompt[:500])
+            if image_data:
+                self.logger.info("Image data included in LLM call.")
+            self.logger.info("LLM CALL #%s at %s", LLMInterface.llm_call_count, now.strftime('%Y-%m-%d %H:%M:%S'))
+            if len(LLMInterface.llm_call_timestamps) > 1:
+                recent = recent_history(LLMInterface.llm_call_timestamps, 5)
+                self.logger.info("Last 5 LLM call times: %s", [t.strftime('%H:%M:%S') for t in recent])
+        # --- END diagnostics ---
+        return contents
+
+    def _cache_lookup(self, prompt: str, image_data: bytes | None) -> tuple[str | None, str | None]:
+        """Returns (cache key, cached response); both are None when caching is off."""
+        if self.cache is None:
+            return None, None
+        key = self.cache.key(prompt, image_data, LLM_TEMPERATURE)
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.logger.info("LLM response served from cache (%s hits, %s misses).", self.cache.stats["hits"], self.cache.stats["misses"])
+        return key, cached
+
+    def _response_text(self, response, cache_key: str | None = None) -> str:
+        if not hasattr(response, 'text') or not response.text:
+            self.logger.error("LLM returned empty or malformed response object.")
+            return json_utils.dumps({"action": "unknown", "error": "LLM returned empty response"})
+        if self.logger.isEnabledFor(logging.INFO):
+            self.logger.info("Received LLM response (first 200 chars): %s...", response.text[:200])
+        if cache_key is not None:
+            self.cache.put(cache_key, response.text)
+        return response.text
+
+    def _error_response(self, e: Exception) -> str:
+        error_str = str(e)
+        if _RATE_LIMIT_RE.search(error_str):
+            self.logger.error("LLM quota/rate limit error: %s", e, exc_info=True)
+            return json_utils.dumps({"action": "unknown", "error": f"LLM quota/rate limit error: {e}"})
+        else:
+            self.logger.error("Error calling LLM API: %s", e, exc_info=True)
+            return json_utils.dumps({"action": "unknown", "error": f"LLM API error: {e}"})
 
     def parse_llm_response(self, response: str) -> dict:
         try:
             start_idx = response.find('{')
-            end_idx = response.rfind('}')
-            if start_idx != -1 and end_idx != -1 and end_idx > start_idx:
-                json_string = response[start_idx : end_idx + 1]
-                parsed_data = json.loads(json_string)
+            if start_idx != -1:
+                parsed_data = first_json_object(response, start_idx)
                 # Fallback: If 'command' is present but 'action' is missing, infer 'action': 'execute_shell_command'
                 if (
                     "action" not in parsed_data and
@@ -75,15 +341,15 @@ class LLMInterface:
                     self.logger.warning("LLM response missing 'action' but has 'command'. Inferring action as 'execute_shell_command'.")
                     parsed_data["action"] = "execute_shell_command"
                 if "action" not in parsed_data and "plan" not in parsed_data and "status" not in parsed_data:
-                    self.logger.error(f"Parsed JSON missing 'action', 'plan', or 'status' key: {parsed_data}")
+                    self.logger.error("Parsed JSON missing 'action', 'plan', or 'status' key: %s", parsed_data)
                     return {"action": "unknown", "error": "Parsed JSON missing required key ('action', 'plan', or 'status')"}
                 return parsed_data
             else:
-                self.logger.error(f"LLM response does not contain valid JSON structure: {response}")
+                self.logger.error("LLM response does not contain valid JSON structure: %s", response)
                 return {"action": "unknown", "error": "LLM response not in JSON format"}
         except json.JSONDecodeError as e:
-            self.logger.error(f"JSON decoding error in LLM response '{response}': {e}", exc_info=True)
+            self.logger.error("JSON decoding error in LLM response '%s': %s", response, e)  # The message says it all; parse failures are retried
             return {"action": "unknown", "error": f"JSON decode error: {e}"}
         except Exception as e:
-            self.logger.error(f"Unexpected error parsing LLM response '{response}': {e}", exc_info=True)
+            self.logger.error("Unexpected error parsing LLM response '%s': %s", response, e, exc_info=True)
             return {"action": "unknown", "error": f"Unexpected parsing error: {e}"}
@@ -1,7 +1,39 @@
 """
 ActionPrompt class for generating action execution prompts for LLM.
 """
-import json
+from functools import lru_cache
+from ...utils import json_utils
+from ...utils.history import recent_history
+
+@lru_cache(maxsize=8)
+def _static_prefix(base_instruction: str, current_task_description: str) -> str:
+    """Part of the action prompt shared by every step of a task; kept byte-identical so provider prefix caches can reuse it."""
+    return f"""
+        ***IMPORTANT: Your response MUST be a single JSON object that ALWAYS includes an 'action' key (e.g., 'action': 'execute_shell_command'). If you do not include the 'action' key, the agent will fail and your output will be ignored.***
+        
+        WARNING: If you omit the 'action' key, your response will be discarded and the task will fail. DO NOT OMIT 'action'.
+        
+        {base_instruction}
+
+        ***Before using the 'task_complete' action, you should consider capturing the screen (using 'capture_screen') and using visual cues to confirm that the task is truly complete.***
+
+        You are currently executing a step in your overall plan. Your goal is to provide the exact parameters for the tool specified in the current plan step.
+
+        Example of a VALID response:
+        {{
+            "action": "execute_shell_command",
+            "command": "notepad",
+            "background": true
+        }}
+        
+        Example of an INVALID response (do NOT do this):
+        {{
+            "command": "notepad",
+            "background": true
+        }}
+
+        Overall Task: "{current_task_description}"
+"""
 
 class ActionPrompt:
     def __init__(self, base_instruction=None):
@@ -10,32 +42,24 @@ class ActionPrompt:
             "Your goal is to accurately understand and execute user tasks."
         )
 
+    def get_static_prefix(self, current_task_description: str) -> str:
+        return _static_prefix(self.base_instruction, current_task_description)
+
     def get_action_execution_prompt(self, current_task_description: str, current_plan_step: dict, last_action_feedback: str, last_read_content: str, last_directory_list: str, last_retrieved_knowledge: str, history: list, failed_steps_summary=None, successful_steps_summary=None) -> str:
         history_str = "\n".join([
             f"- {entry['action']['action']} (Result: {entry.get('feedback', 'No feedback')})"
-            for entry in history[-5:]
+            for entry in recent_history(history, 5)
         ])
         failed_str = "\n".join([
             f"Step: {k}, Failures: {v}" for k, v in (failed_steps_summary or {}).items()
         ])
         success_str = "\n".join(successful_steps_summary or [])
-        return f"""
-        ***IMPORTANT: Your response MUST be a single JSON object that ALWAYS includes an 'action' key (e.g., 'action': 'execute_shell_command'). If you do not include the 'action' key, the agent will fail and your output will be ignored.***
-        
-        WARNING: If you omit the 'action' key, your response will be discarded and the task will fail. DO NOT OMIT 'action'.
-        
-        {self.base_instruction}
-
-        ***Before using the 'task_complete' action, you should consider capturing the screen (using 'capture_screen') and using visual cues to confirm that the task is truly complete.***
-
-        You are currently executing a step in your overall plan. Your goal is to provide the exact parameters for the tool specified in the current plan step.
-
-        Overall Task: "{current_task_description}"
-
+        # Static part first, step-specific part last
+        return self.get_static_prefix(current_task_description) + f"""
         Current Plan Step:
         Action: {current_plan_step.get('action')}
         Description: {current_plan_step.get('description', 'No description provided.')}
-        Previous Parameters (if any from plan): {json.dumps({k: v for k, v in current_plan_step.items() if k not in ['action', 'description']})}
+        Previous Parameters (if any from plan): {json_utils.dumps({k: v for k, v in current_plan_step.items() if k not in ['action', 'description']})}
 
         Last Action Feedback: {last_action_feedback}
         Last Read Content: {last_read_content if last_read_content else 'None'}
@@ -49,18 +73,5 @@ class ActionPrompt:
         Successful Steps Summary:
         {success_str if success_str else 'None'}
 
-        Example of a VALID response:
-        {{
-            "action": "execute_shell_command",
-            "command": "notepad",
-            "background": true
-        }}
-        
-        Example of an INVALID response (do NOT do this):
-        {{
-            "command": "notepad",
-            "background": true
-        }}
-        
         Provide ONLY the JSON response. Do not include any other text.
         """
@@ -1,6 +1,8 @@
 """
 PlanningPrompt class for generating planning prompts for LLM.
 """
+from functools import lru_cache
+from ...utils.history import recent_history
 
 try:
     from ..action_executor import ActionExecutor
@@ -11,6 +13,41 @@ except ImportError:
         "read_file", "write_file", "execute_shell_command", "focus_window", "list_directory", "capture_screen", "move_mouse", "wait", "task_complete", "type_text", "press_key", "hotkey", "click", "ask_user"
     ]
 
+@lru_cache(maxsize=4)
+def _static_prefix(base_instruction: str, tools_description: str) -> str:
+    """Part of the planning prompt that is the same for every task; kept first and byte-identical so provider prefix caches can reuse it."""
+    allowed_actions_str = ', '.join(f'"{a}"' for a in allowed_actions)
+    return f"""
+        {base_instruction}
+
+        You are currently in the planning phase. Your objective is to break down the main task into a sequence of smaller, manageable steps. For each step, you should decide which tool to use and provide a brief description of the step.
+
+        Available Tools and their usage:
+        {tools_description}
+
+        ***IMPORTANT: You may ONLY use the following actions/tools in your plan: {allowed_actions_str}. Do NOT use any other action or tool not listed here. Prefer executing shell commands over other actions. If you think about it, most tasks can be completed with the shell alone.***
+
+        Based on the task given below and the available tools, provide a plan as a JSON array of objects. Each object in the array should represent a step in your plan and *must* have an "action" key (the name of the tool to use) and a "description" key. You can also include other parameters for the action if you know them (e.g., "file" for "read_file"). The "action" key must directly map to one of the available tools.
+
+        You should use yor ingenuity and common sense to effectively complete the task
+
+        ***When planning to complete a task, consider using visual cues by capturing the screen (using the 'capture_screen' action) and analyzing the result to confirm that the task is truly complete before using 'task_complete'.***
+
+        If the first step does not depend on what is currently on screen (e.g. a shell command or a file operation) and you know all of its parameters, put a "first_action" key BEFORE "plan": the complete action object for that first step, exactly as it should be executed. Otherwise omit "first_action".
+
+        Example Plan Structure:
+        {{
+            "first_action": {{"action": "list_directory", "path": "."}},
+            "plan": [
+                {{"action": "list_directory", "description": "First, I need to see what files are in the current directory."}},
+                {{"action": "read_file", "file": "important_doc.txt", "description": "Then, I'll read the important document to gather information."}},
+                {{"action": "type_text", "text": "Hello World!", "description": "Finally, I'll type 'Hello World!' into an open application."}},
+                {{"action": "capture_screen", "description": "Capture the screen to visually confirm the result before finishing."}},
+                {{"action": "task_complete", "description": "The task is finished after visually confirming completion."}}
+            ]
+        }}
+"""
+
 class PlanningPrompt:
     def __init__(self):
         self.base_instruction = (
@@ -18,19 +55,43 @@ class PlanningPrompt:
             "Your goal is to accurately understand and execute user tasks."
         )
 
+    def get_static_prefix(self, tools_description: str) -> str:
+        return _static_prefix(self.base_instruction, tools_description)
+
     def get_planning_prompt(self, task_description: str, current_context: str, tools_description: str, history: list) -> str:
+        history_str = "\n".join([
+            f"- {entry['action']['action']} (Result: {entry.get('feedback', 'No feedback')})"
+            for entry in recent_history(history, 5)
+        ])
+        # Static part first, task-specific part last
+        return self.get_static_prefix(tools_description) + f"""
+        Here is the main task you need to accomplish:
+        Task: "{task_description}"
+
+        Current System Context/Observations:
+        {current_context}
+
+        Recent Action History (for context and learning from past attempts):
+        {history_str if history_str else "No recent history."}
+
+        Provide ONLY the JSON response. Do not include any other text.
+        """
+
+    def get_batch_planning_prompt(self, subtasks: list, current_context: str, tools_description: str, history: list) -> str:
+        """Planning prompt for several independent subtasks at once; the LLM answers with one plan per subtask id."""
         allowed_actions_str = ', '.join(f'"{a}"' for a in allowed_actions)
         history_str = "\n".join([
             f"- {entry['action']['action']} (Result: {entry.get('feedback', 'No feedback')})"
-            for entry in history[-5:]
+            for entry in recent_history(history, 5)
         ])
+        subtasks_str = "\n".join(f'{i}. "{subtask}"' for i, subtask in enumerate(subtasks))
         return f"""
         {self.base_instruction}
 
-        You are currently in the planning phase. Your objective is to break down the main task into a sequence of smaller, manageable steps. For each step, you should decide which tool to use and provide a brief description of the step.
+        You are currently in the planning phase for several independent subtasks. For EACH subtask below, break it down into a sequence of smaller, manageable steps, deciding which tool to use for each step and giving a brief description.
 
-        Here is the main task you need to accomplish:
-        Task: "{task_description}"
+        Subtasks (id. description):
+        {subtasks_str}
 
         Current System Context/Observations:
         {current_context}
@@ -38,25 +99,18 @@ class PlanningPrompt:
         Available Tools and their usage:
         {tools_description}
 
-        ***IMPORTANT: You may ONLY use the following actions/tools in your plan: {allowed_actions_str}. Do NOT use any other action or tool not listed here. Prefer executing shell commands over other actions. If you think about it, most tasks can be completed with the shell alone.***
+        ***IMPORTANT: You may ONLY use the following actions/tools in your plans: {allowed_actions_str}. Do NOT use any other action or tool not listed here. Prefer executing shell commands over other actions.***
 
         Recent Action History (for context and learning from past attempts):
         {history_str if history_str else "No recent history."}
 
-        Based on the task and available tools, provide a plan as a JSON array of objects. Each object in the array should represent a step in your plan and *must* have an "action" key (the name of the tool to use) and a "description" key. You can also include other parameters for the action if you know them (e.g., "file" for "read_file"). The "action" key must directly map to one of the available tools.
-
-        You should use yor ingenuity and common sense to effectively complete the task
-
-        ***When planning to complete a task, consider using visual cues by capturing the screen (using the 'capture_screen' action) and analyzing the result to confirm that the task is truly complete before using 'task_complete'.***
+        Each step object *must* have an "action" key (the name of the tool to use) and a "description" key, plus any known parameters for the action. Return exactly one entry per subtask, with the subtask's id.
 
-        Example Plan Structure:
+        Example Structure for two subtasks:
         {{
-            "plan": [
-                {{"action": "list_directory", "description": "First, I need to see what files are in the current directory."}},
-                {{"action": "read_file", "file": "important_doc.txt", "description": "Then, I'll read the important document to gather information."}},
-                {{"action": "type_text", "text": "Hello World!", "description": "Finally, I'll type 'Hello World!' into an open application."}},
-                {{"action": "capture_screen", "description": "Capture the screen to visually confirm the result before finishing."}},
-                {{"action": "task_complete", "description": "The task is finished after visually confirming completion."}}
+            "plans": [
+                {{"id": 0, "plan": [{{"action": "list_directory", "description": "See what files exist."}}]}},
+                {{"id": 1, "plan": [{{"action": "read_file", "file": "notes.txt", "description": "Read the notes."}}]}}
             ]
         }}
         Provide ONLY the JSON response. Do not include any other text.
@@ -2,6 +2,7 @@
 SelfEvaluationPrompt class for generating self-evaluation prompts for LLM.
 """
 import json
+from ...utils.history import recent_history
 
 class SelfEvaluationPrompt:
     def __init__(self, base_instruction=None):
@@ -12,7 +13,7 @@ class SelfEvaluationPrompt:
 
     def get_self_evaluation_prompt(self, current_task: str, history: list, final_state: dict) -> str:
         history_str = "\n".join([
-            f"- {entry['action']['action']} (Result: {entry['action'].get('status', 'unknown')})" for entry in history[-10:]
+            f"- {entry['action']['action']} (Result: {entry['action'].get('status', 'unknown')})" for entry in recent_history(history, 10)
         ])
         return f"""
         {self.base_instruction}
@@ -24,7 +25,7 @@ class SelfEvaluationPrompt:
         {history_str if history_str else 'No recent history.'}
 
         Final Agent State:
-        {json.dumps(final_state, indent=2)}
+        {json.dumps(final_state, indent=2, default=list)}
 
         Please answer the following:
         - Did you accomplish the task successfully? Why or why not?
@@ -3,8 +3,9 @@ KnowledgeBase manages the storage and retrieval of agent knowledge and state usi
 """
 
 import sqlite3
-import json
 import os
+from ..utils import json_utils
+from ..utils.history import HISTORY_MAX
 
 
 class KnowledgeBase:
@@ -42,10 +43,19 @@ class KnowledgeBase:
                 )
                 """
             )
+            # Append-only journal of agent_state["history"], so saving the state does not rewrite every past action
+            cursor.execute(
+                """
+                CREATE TABLE IF NOT EXISTS agent_history (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    entry TEXT
+                )
+                """
+            )
             conn.commit()
-            self.logger.info(f"KnowledgeBase initialized at {self.db_path}")
+            self.logger.info("KnowledgeBase initialized at %s", self.db_path)
         except sqlite3.Error as e:
-            self.logger.error(f"Error initializing database: {e}")
+            self.logger.error("Error initializing database: %s", e)
         finally:
             if conn:
                 conn.close()
@@ -60,10 +70,10 @@ class KnowledgeBase:
                 "INSERT OR REPLACE INTO knowledge (key, value) VALUES (?, ?)", (key, value)
             )
             conn.commit()
-            self.logger.info(f"Stored knowledge: {key} = {value[:50]}...")
+            self.logger.info("Stored knowledge: %s = %s...", key, value[:50])
             return True
         except sqlite3.Error as e:
-            self.logger.error(f"Error storing knowledge: {e}")
+            self.logger.error("Error storing knowledge: %s", e)
             return False
         finally:
             if conn:
@@ -78,12 +88,12 @@ class KnowledgeBase:
             cursor.execute("SELECT value FROM knowledge WHERE key = ?", (key,))
             result = cursor.fetchone()
             if result:
-                self.logger.info(f"Retrieved knowledge for {key}")
+                self.logger.info("Retrieved knowledge for %s", key)
                 return result[0]
-            self.logger.info(f"No knowledge found for key: {key}")
+            self.logger.info("No knowledge found for key: %s", key)
             return None
         except sqlite3.Error as e:
-            self.logger.error(f"Error retrieving knowledge: {e}")
+            self.logger.error("Error retrieving knowledge: %s", e)
             return None
         finally:
             if conn:
@@ -97,28 +107,39 @@ class KnowledgeBase:
             cursor = conn.cursor()
             cursor.execute("DELETE FROM knowledge WHERE key = ?", (key,))
             conn.commit()
-            self.logger.info(f"Deleted knowledge for key: {key}")
+            self.logger.info("Deleted knowledge for key: %s", key)
             return True
         except sqlite3.Error as e:
-            self.logger.error(f"Error deleting knowledge: {e}")
+            self.logger.error("Error deleting knowledge: %s", e)
             return False
         finally:
             if conn:
                 conn.close()
 
-    def store_agent_state(self, state: dict) -> bool:
-        """Stores the current state of the agent."""
+    def store_agent_state(self, state: dict, new_history: list | None = None) -> bool:
+        """Stores the current state of the agent.
+
+        With new_history, only those entries are appended to the stored history; otherwise state["history"], if any, replaces it.
+        """
         conn = None
         try:
             conn = sqlite3.connect(self.db_path)
             cursor = conn.cursor()
-            state_json = json.dumps(state)
-            cursor.execute("INSERT OR REPLACE INTO agent_state (id, state_data) VALUES (1, ?)", (state_json,))
+            state = dict(state)
+            history = state.pop("history", None)
+            cursor.execute("INSERT OR REPLACE INTO agent_state (id, state_data) VALUES (1, ?)", (json_utils.dumps(state),))
+            if new_history is None:
+                cursor.execute("DELETE FROM agent_history")
+                new_history = history or ()
+            if new_history:
+                cursor.executemany("INSERT INTO agent_history (entry) VALUES (?)", [(json_utils.dumps(entry),) for entry in new_history])
+                # Keep the journal as bounded as the in-memory history
+                cursor.execute("DELETE FROM agent_history WHERE seq <= (SELECT MAX(seq) FROM agent_history) - ?", (HISTORY_MAX,))
             conn.commit()
             self.logger.info("Agent state stored.")
             return True
         except sqlite3.Error as e:
-            self.logger.error(f"Error storing agent state: {e}")
+            self.logger.error("Error storing agent state: %s", e)
             return False
         finally:
             if conn:
@@ -133,13 +154,17 @@ class KnowledgeBase:
             cursor.execute("SELECT state_data FROM agent_state WHERE id = 1")
             result = cursor.fetchone()
             if result:
-                state = json.loads(result[0])
+                state = json_utils.loads(result[0])
+                cursor.execute("SELECT entry FROM agent_history ORDER BY seq DESC LIMIT ?", (HISTORY_MAX,))
+                rows = cursor.fetchall()
+                if rows:
+                    state["history"] = [json_utils.loads(row[0]) for row in reversed(rows)]
                 self.logger.info("Agent state loaded.")
                 return state
             self.logger.info("No agent state found.")
             return None
         except sqlite3.Error as e:
-            self.logger.error(f"Error loading agent state: {e}")
+            self.logger.error("Error loading agent state: %s", e)
             return None
         finally:
             if conn:
@@ -19,22 +19,22 @@ class FileIO:
         # This is a heuristic and might not cover all binary files
         image_extensions = ['.png', '.jpg', '.jpeg', '.gif', '.bmp', '.tiff', '.webp']
         if any(filepath.lower().endswith(ext) for ext in image_extensions):
-            self.logger.error(f"Attempted to read binary image file '{filename}' as text. Use appropriate image handling for this file type.")
-            self.logger.warning(f"Error: Cannot read image file '{filename}' as text. This function is for text files.")
+            self.logger.error("Attempted to read binary image file '%s' as text. Use appropriate image handling for this file type.", filename)
+            self.logger.warning("Error: Cannot read image file '%s' as text. This function is for text files.", filename)
             return None
 
         try:
             with open(filepath, 'r', encoding='utf-8', errors='ignore') as f: # Specify encoding and error handling
                 content = f.read()
-            self.logger.info(f"Successfully read file: {filename}")
+            self.logger.info("Successfully read file: %s", filename)
             return content
         except FileNotFoundError:
-            self.logger.error(f"Error: File not found at {filepath}")
-            self.logger.warning(f"Error: File not found at {filepath}")
+            self.logger.error("Error: File not found at %s", filepath)
+            self.logger.warning("Error: File not found at %s", filepath)
             return None
         except Exception as e:
-            self.logger.error(f"Error reading file {filename}: {e}", exc_info=True)
-            self.logger.warning(f"Error reading file {filename}: {e}")
+            self.logger.error("Error reading file %s: %s", filename, e, exc_info=True)
+            self.logger.warning("Error reading file %s: %s", filename, e)
             return None
 
     def write_file(self, filename: str, content: str) -> bool:
@@ -43,10 +43,10 @@ class FileIO:
         try:
             with open(filepath, 'w', encoding='utf-8') as f: # Specify encoding
                 f.write(content)
-            self.logger.info(f"Successfully wrote to file: {filename}")
+            self.logger.info("Successfully wrote to file: %s", filename)
             return True
         except Exception as e:
-            self.logger.error(f"Error writing to file {filename}: {e}", exc_info=True)
+            self.logger.error("Error writing to file %s: %s", filename, e, exc_info=True)
             print(f"Error writing to file {filename}: {e}")
             return False
 
@@ -55,13 +55,13 @@ class FileIO:
         target_path = os.path.join(self.base_path, path)
         try:
             contents = os.listdir(target_path)
-            self.logger.info(f"Listed contents of directory {target_path}")
+            self.logger.info("Listed contents of directory %s", target_path)
             return contents
         except FileNotFoundError:
-            self.logger.error(f"Error: Directory not found at {target_path}")
+            self.logger.error("Error: Directory not found at %s", target_path)
             print(f"Error: Directory not found at {target_path}")
             return None
         except Exception as e:
-            self.logger.error(f"Error listing directory {target_path}: {e}", exc_info=True)
+            self.logger.error("Error listing directory %s: %s", target_path, e, exc_info=True)
             print(f"Error listing directory {target_path}: {e}")
             return None
\ No newline at end of file
@@ -3,17 +3,52 @@ ScreenCapture class for capturing screenshots and screen regions with logging an
 """
 
 from typing import Optional
-import pyautogui
 from PIL import Image
 import io
+import os
 from ..utils.logger import Logger
-from ..utils.platform_utils import is_windows, is_mac, is_linux
+from ..utils.platform_utils import is_windows, is_mac, is_linux, get_pyautogui as _pg, pyautogui_errors
+
+try:
+    import numpy as np
+    import simplejpeg
+except ImportError:
+    simplejpeg = None
+
+# JPEG quality of the image bytes handed to the LLM
+LLM_JPEG_QUALITY = 70
+# Longest side of full-screen images handed to the LLM; image token cost grows with pixel area. 0 disables downscaling
+LLM_MAX_IMAGE_DIM = int(os.environ.get("AGENT_SCREENSHOT_MAX_DIM", "1024"))
+
+def _downscale(image: Image.Image, max_dim: int) -> tuple[Image.Image, float]:
+    """Shrinks image so its longest side is at most max_dim; returns the image and the screen-pixels-per-image-pixel scale."""
+    longest = max(image.size)
+    if not max_dim or longest <= max_dim:
+        return image, 1.0
+    scale = longest / max_dim
+    size = (max(1, round(image.width / scale)), max(1, round(image.height / scale)))
+    # reducing_gap lets Pillow shrink by an integer factor first, which is much faster than a full resample
+    return image.resize(size, Image.Resampling.BILINEAR, reducing_gap=2.0), scale
+
+def _encode_for_llm(image: Image.Image, quality: int = LLM_JPEG_QUALITY) -> bytes:
+    """Encodes a screenshot as JPEG, which is much cheaper to produce and upload than PNG.
+
+    Uses simplejpeg (libjpeg-turbo) when installed, otherwise Pillow's JPEG encoder.
+    """
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    if simplejpeg is not None:
+        return simplejpeg.encode_jpeg(np.asarray(image), quality=quality, colorspace="RGB")
+    img_byte_arr = io.BytesIO()
+    image.save(img_byte_arr, format='JPEG', quality=quality)
+    return img_byte_arr.getvalue()
 
 class ScreenCapture:
     """Handles screen capture operations for the agent."""
     def __init__(self):
-        pyautogui.FAILSAFE = True
         self.logger = Logger()
+        # Screen pixels per image pixel of the last full-screen capture_screen_bytes result
+        self.last_image_scale = 1.0
         try:
             from PIL import Image
             self.logger.info("Pillow (PIL) library is available for image processing.")
@@ -30,69 +65,68 @@ class ScreenCapture:
             self.logger.error("Screen capture is not supported on this platform.")
             return None
         try:
-            screenshot = pyautogui.screenshot()
+            screenshot = _pg().screenshot()
             if filename:
                 screenshot.save(filename)
-                self.logger.info(f"Screenshot saved to {filename}")
+                self.logger.info("Screenshot saved to %s", filename)
             self.logger.info("Screen captured successfully.")
             return screenshot
-        except pyautogui.PyAutoGUIException as e:
-            self.logger.error(f"PyAutoGUI error capturing screen: {e}.", exc_info=True)
+        except pyautogui_errors() as e:
+            self.logger.error("PyAutoGUI error capturing screen: %s.", e, exc_info=True)
             return None
         except Exception as e:
-            self.logger.error(f"An unexpected error occurred capturing screen: {e}", exc_info=True)
+            self.logger.error("An unexpected error occurred capturing screen: %s", e, exc_info=True)
             return None
 
-    def capture_screen_bytes(self, filename: str | None = None) -> bytes | None:
-        """Captures the entire screen and returns the image data as bytes. Optionally saves to a file."""
+    def capture_screen_bytes(self, filename: str | None = None, max_dim: int = LLM_MAX_IMAGE_DIM, quality: int = LLM_JPEG_QUALITY) -> bytes | None:
+        """Captures the entire screen and returns it as JPEG bytes, downscaled to max_dim. Optionally saves the full-size image to a file."""
         try:
-            screenshot_pil = pyautogui.screenshot()
+            screenshot_pil = _pg().screenshot()
             if filename:
-                screenshot_pil.save(filename)
-                self.logger.info(f"Screenshot saved to {filename}")
-            img_byte_arr = io.BytesIO()
-            screenshot_pil.save(img_byte_arr, format='PNG')
+                screenshot_pil.save(filename, compress_level=1)  # Fastest PNG level; the file is only for inspection
+                self.logger.info("Screenshot saved to %s", filename)
+            scaled, self.last_image_scale = _downscale(screenshot_pil, max_dim)
+            image_bytes = _encode_for_llm(scaled, quality)
             self.logger.info("Screen captured as bytes.")
-            return img_byte_arr.getvalue()
-        except pyautogui.PyAutoGUIException as e:
-            self.logger.error(f"PyAutoGUI error capturing screen to bytes: {e}.", exc_info=True)
+            return image_bytes
+        except pyautogui_errors() as e:
+            self.logger.error("PyAutoGUI error capturing screen to bytes: %s.", e, exc_info=True)
             return None
         except Exception as e:
-            self.logger.error(f"An unexpected error occurred capturing screen to bytes: {e}", exc_info=True)
+            self.logger.error("An unexpected error occurred capturing screen to bytes: %s", e, exc_info=True)
             return None
 
     def capture_region(self, left: int, top: int, width: int, height: int, filename: str | None = None) -> Optional[Image.Image]:
         """Captures a specific region of the screen. Optionally saves to a file."""
         try:
-            screenshot = pyautogui.screenshot(region=(left, top, width, height))
+            screenshot = _pg().screenshot(region=(left, top, width, height))
             if filename:
                 screenshot.save(filename)
-                self.logger.info(f"Region screenshot saved to {filename} (Region: {left},{top},{width},{height})")
-            self.logger.info(f"Region captured: ({left}, {top}, {width}, {height}).")
+                self.logger.info("Region screenshot saved to %s (Region: %s,%s,%s,%s)", filename, left, top, width, height)
+            self.logger.info("Region captured: (%s, %s, %s, %s).", left, top, width, height)
             return screenshot
-        except pyautogui.PyAutoGUIException as e:
-            self.logger.error(f"PyAutoGUI error capturing region ({left},{top},{width},{height}): {e}.", exc_info=True)
+        except pyautogui_errors() as e:
+            self.logger.error("PyAutoGUI error capturing region (%s,%s,%s,%s): %s.", left, top, width, height, e, exc_info=True)
             return None
         except Exception as e:
-            self.logger.error(f"An unexpected error occurred capturing region ({left},{top},{width},{height}): {e}", exc_info=True)
+            self.logger.error("An unexpected error occurred capturing region (%s,%s,%s,%s): %s", left, top, width, height, e, exc_info=True)
             return None
 
     def capture_region_bytes(self, left: int, top: int, width: int, height: int, filename: str | None = None) -> bytes | None:
-        """Captures a specific region of the screen and returns the image data as bytes. Optionally saves to a file."""
+        """Captures a specific region of the screen and returns it as JPEG bytes. Optionally saves to a file."""
         try:
-            screenshot_pil = pyautogui.screenshot(region=(left, top, width, height))
+            screenshot_pil = _pg().screenshot(region=(left, top, width, height))
             if filename:
-                screenshot_pil.save(filename)
-                self.logger.info(f"Region screenshot saved to {filename} (Region: {left},{top},{width},{height})")
-            img_byte_arr = io.BytesIO()
-            screenshot_pil.save(img_byte_arr, format='PNG')
-            self.logger.info(f"Region captured as bytes: ({left}, {top}, {width}, {height})")
-            return img_byte_arr.getvalue()
-        except pyautogui.PyAutoGUIException as e:
-            self.logger.error(f"PyAutoGUI error capturing region to bytes ({left},{top},{width},{height}): {e}.", exc_info=True)
+                screenshot_pil.save(filename, compress_level=1)
+                self.logger.info("Region screenshot saved to %s (Region: %s,%s,%s,%s)", filename, left, top, width, height)
+            image_bytes = _encode_for_llm(screenshot_pil)
+            self.logger.info("Region captured as bytes: (%s, %s, %s, %s)", left, top, width, height)
+            return image_bytes
+        except pyautogui_errors() as e:
+            self.logger.error("PyAutoGUI error capturing region to bytes (%s,%s,%s,%s): %s.", left, top, width, height, e, exc_info=True)
             return None
         except Exception as e:
-            self.logger.error(f"An unexpected error occurred capturing region to bytes ({left},{top},{width},{height}): {e}", exc_info=True)
+            self.logger.error("An unexpected error occurred capturing region to bytes (%s,%s,%s,%s): %s", left, top, width, height, e, exc_info=True)
             return None
 
 if __name__ == "__main__":
@@ -1,32 +1,33 @@
 import os
-import re
 from typing import List
 
+def _normalize_extensions(extensions: List[str] = None) -> tuple:
+    """Lowercases extensions into a tuple so a single str.endswith call can test them all."""
+    return tuple(ext.lower() for ext in extensions) if extensions else ()
+
 def find_files_by_keyword(directory: str, keyword: str, extensions: List[str] = None) -> List[str]:
     """Search for files in a directory whose names contain the keyword (case-insensitive) and match given extensions."""
     matches = []
     if not os.path.isdir(directory):
         return matches
+    keyword_lower = keyword.lower()
+    ext_tuple = _normalize_extensions(extensions)
     for fname in os.listdir(directory):
-        if keyword.lower() in fname.lower():
-            if extensions:
-                if any(fname.lower().endswith(ext) for ext in extensions):
-                    matches.append(fname)
-            else:
-                matches.append(fname)
+        fname_lower = fname.lower()
+        if keyword_lower in fname_lower and (not ext_tuple or fname_lower.endswith(ext_tuple)):
+            matches.append(fname)
     return matches
 
 def find_files_by_keyword_recursive(directory: str, keyword: str, extensions: List[str] = None) -> List[str]:
     """Recursively search for files in a directory and all subdirectories whose names contain the keyword (case-insensitive) and match given extensions."""
     matches = []
+    keyword_lower = keyword.lower()
+    ext_tuple = _normalize_extensions(extensions)
     for root, _, files in os.walk(directory):
         for fname in files:
-            if keyword.lower() in fname.lower():
-                if extensions:
-                    if any(fname.lower().endswith(ext) for ext in extensions):
-                        matches.append(os.path.join(root, fname))
-                else:
-                    matches.append(os.path.join(root, fname))
+            fname_lower = fname.lower()
+            if keyword_lower in fname_lower and (not ext_tuple or fname_lower.endswith(ext_tuple)):
+                matches.append(os.path.join(root, fname))
     return matches
 
 VIDEO_EXTENSIONS = ['.mp4', '.avi', '.mov', '.mkv', '.wmv', '.flv']
@@ -0,0 +1,20 @@
+# agent_ai/utils/history.py
+"""
+Helpers for the bounded action history kept in agent_state["history"].
+"""
+import os
+from collections import deque
+from itertools import islice
+
+# Maximum number of action entries kept in memory
+HISTORY_MAX = int(os.environ.get("AGENT_HISTORY_MAX", "500"))
+
+def bounded_history(entries=()) -> deque:
+    """Returns a history deque holding at most HISTORY_MAX of the most recent entries."""
+    return deque(entries, maxlen=HISTORY_MAX)
+
+def recent_history(history, n: int) -> list:
+    """Returns the last n entries of a history list or deque, oldest first, without copying the rest."""
+    recent = list(islice(reversed(history), n))
+    recent.reverse()
+    return recent
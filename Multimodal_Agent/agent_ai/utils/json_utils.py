@@ -0,0 +1,25 @@
+# agent_ai/utils/json_utils.py
+"""
+Fast JSON helpers: use orjson when it is installed and fall back to the standard library otherwise.
+"""
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def dumps(obj, sort_keys: bool = False, default=None) -> str:
+    """Serializes obj to a compact JSON string; default converts unsupported objects as in json.dumps (str if omitted)."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, default=default, option=orjson.OPT_SORT_KEYS if sort_keys else 0).decode()
+        except TypeError:
+            pass  # e.g. non-string keys or types orjson does not know; let json handle them
+    return json.dumps(obj, sort_keys=sort_keys, separators=(",", ":"), default=default or str)
+
+def loads(data: str | bytes):
+    """Parses a JSON document; raises ValueError on invalid input like json.loads."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
@@ -51,6 +51,10 @@ class Logger:
         """Logs a debug message."""
         self.logger.debug(message, *args, **kwargs)
 
+    def isEnabledFor(self, level: int) -> bool:
+        """Whether messages of this level are logged; lets callers skip building expensive log arguments."""
+        return self.logger.isEnabledFor(level)
+
 # Example Usage (for testing)
 if __name__ == "__main__":
     logger = Logger()
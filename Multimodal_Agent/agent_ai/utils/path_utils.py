@@ -1,6 +1,9 @@
 import os
 from typing import Optional
 
+# The user's home directory does not change while the agent runs, so it is resolved once at import
+_USER_PROFILE = os.environ.get('USERPROFILE') or os.environ.get('HOME')
+
 def resolve_special_folder(folder_name: str) -> Optional[str]:
     """
     Attempts to resolve the absolute path of a special folder (e.g., 'videos', 'documents', 'desktop')
@@ -8,7 +11,7 @@ def resolve_special_folder(folder_name: str) -> Optional[str]:
     The folder_name should be case-insensitive and not hardcoded in the agent logic.
     """
     folder_name = folder_name.lower()
-    user_profile = os.environ.get('USERPROFILE') or os.environ.get('HOME')
+    user_profile = _USER_PROFILE
     if not user_profile:
         return None
     # Common Windows folders
@@ -4,6 +4,7 @@ Platform utilities for cross-platform checks and helpers.
 """
 import sys
 import platform
+from functools import lru_cache
 
 def is_windows() -> bool:
     """Returns True if the current platform is Windows."""
@@ -17,8 +18,25 @@ def is_linux() -> bool:
     """Returns True if the current platform is Linux."""
     return sys.platform.startswith('linux')
 
+@lru_cache(maxsize=1)
+def get_pyautogui():
+    """Returns the pyautogui module, importing and configuring it on first use.
+
+    pyautogui pulls in Pillow, mss and probes the display on import, so callers load it through here when first needed.
+    """
+    import pyautogui
+    pyautogui.FAILSAFE = True
+    return pyautogui
+
+def pyautogui_errors() -> tuple:
+    """Exception types of a failed pyautogui capture or load: ImportError, plus PyAutoGUIException once pyautogui is loaded."""
+    pyautogui = sys.modules.get("pyautogui")
+    error = getattr(pyautogui, "PyAutoGUIException", None)
+    return (ImportError, error) if error is not None else (ImportError,)
+
+@lru_cache(maxsize=1)
 def get_platform_name() -> str:
-    """Returns a human-readable platform name."""
+    """Returns a human-readable platform name (computed once; the platform never changes at runtime)."""
     if is_windows():
         return 'Windows'
     if is_mac():
@@ -20,10 +20,11 @@ def focus_window(title_substring: str, timeout: float = 5.0) -> bool:
         bool: True if the window was successfully focused, False otherwise.
     """
     end_time = time.time() + timeout
+    title_lower = title_substring.lower()
     while time.time() < end_time:
         windows = gw.getAllTitles()
         for win_title in windows:
-            if title_substring.lower() in win_title.lower():
+            if title_lower in win_title.lower():
                 win = gw.getWindowsWithTitle(win_title)[0]
                 win.activate()
                 return True
@@ -40,7 +41,8 @@ def list_open_windows() -> list:
 def is_window_open(title_substring: str) -> bool:
     """Checks if any window with the given substring is open."""
     try:
-        return any(title_substring.lower() in t.lower() for t in gw.getAllTitles())
+        title_lower = title_substring.lower()
+        return any(title_lower in t.lower() for t in gw.getAllTitles())
     except Exception:
         return False
 
@@ -54,6 +56,7 @@ def list_processes() -> list:
 def is_process_running(process_name: str) -> bool:
     """Checks if a process with the given name is running."""
     try:
-        return any(process_name.lower() in p.name().lower() for p in psutil.process_iter(['name']))
+        name_lower = process_name.lower()
+        return any(name_lower in p.name().lower() for p in psutil.process_iter(['name']))
     except Exception:
         return False
@@ -0,0 +1,155 @@
+import unittest
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), 'agent_ai')))
+from agent_ai.core.action_executor import ActionExecutor, _CachedEnum
+from agent_ai.action.system_interaction import SystemInteraction
+from agent_ai.perception.file_io import FileIO
+from agent_ai.utils.logger import Logger
+
+class CachedEnumTest(unittest.TestCase):
+    """Unit tests for the _CachedEnum helper."""
+    def test_value_is_reused_within_ttl(self):
+        calls = []
+        enum = _CachedEnum(lambda: calls.append(1) or ["window"], ttl=60)
+        self.assertEqual(enum.get(), ["window"])
+        self.assertEqual(enum.get(), ["window"])
+        self.assertEqual(len(calls), 1)
+        enum.mark_stale()
+        self.assertEqual(enum.get(), ["window"])
+        self.assertEqual(len(calls), 2)
+
+    def test_slow_refresh_reports_last_value_until_done(self):
+        release = threading.Event()
+        values = iter([["old"], ["new"]])
+        enum = _CachedEnum(lambda: release.wait(5) and next(values))
+        release.set()
+        self.assertEqual(enum.get(), ["old"])
+        release.clear()
+        enum.mark_stale()
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            enum.prefetch(pool)
+            self.assertEqual(enum.get(timeout=0.05), ["old"])
+            release.set()
+            self.assertEqual(enum.get(timeout=5), ["new"])
+
+    def test_first_enumeration_waits_for_a_value(self):
+        release = threading.Event()
+        enum = _CachedEnum(lambda: release.wait(5) and ["window"])
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            enum.prefetch(pool)
+            threading.Timer(0.1, release.set).start()
+            self.assertEqual(enum.get(timeout=0.01), ["window"])
+
+class FakeSystemInteraction:
+    """Stands in for keyboard and window automation."""
+    def type_text(self, text, interval=0.05):
+        pass
+
+    def focus_window(self, title_substring):
+        return True
+
+class ActionExecutorTest(unittest.TestCase):
+    """Unit tests for ActionExecutor class."""
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.agent_state = {"history": []}
+        self.executor = ActionExecutor(FileIO(self.tmp.name), None, SystemInteraction(), Logger(), self.agent_state)
+        # Keep the tests away from the real window manager and process table
+        self.executor._windows_cache = _CachedEnum(lambda: ["Editor"])
+        self.executor._processes_cache = _CachedEnum(lambda: ["python"])
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, name, content):
+        with open(os.path.join(self.tmp.name, name), "w", encoding="utf-8") as f:
+            f.write(content)
+
+    def count_reads(self) -> list:
+        reads = []
+        read_file = self.executor.file_io.read_file
+        self.executor.file_io.read_file = lambda name: reads.append(name) or read_file(name)
+        return reads
+
+    def test_repeated_read_is_served_from_cache(self):
+        self.write("notes.txt", "text")
+        reads = self.count_reads()
+        self.executor.execute_action({"action": "read_file", "file": "notes.txt"})
+        self.executor.execute_action({"action": "read_file", "file": "notes.txt"})
+        self.assertEqual(reads, ["notes.txt"])
+        # Any state-changing action drops cached reads
+        self.executor.execute_action({"action": "write_file", "file": "other.txt", "content": "x"})
+        self.executor.execute_action({"action": "read_file", "file": "notes.txt"})
+        self.assertEqual(reads, ["notes.txt", "notes.txt"])
+
+    def test_read_file_sees_outside_changes(self):
+        self.write("notes.txt", "first")
+        self.assertEqual(self.executor.execute_action({"action": "read_file", "file": "notes.txt"})["status"], "success")
+        self.assertEqual(self.agent_state["last_read_content"], "first")
+        # Rewritten by another process within the cache TTL
+        self.write("notes.txt", "second version")
+        self.executor.execute_action({"action": "read_file", "file": "notes.txt"})
+        self.assertEqual(self.agent_state["last_read_content"], "second version")
+
+    def test_batch_keeps_every_read_in_step_order(self):
+        self.write("a.txt", "A")
+        self.write("b.txt", "B")
+        feedback = self.executor.execute_action({"action": "batch", "steps": [
+            {"action": "read_file", "file": "a.txt"},
+            {"action": "read_file", "file": "b.txt"},
+            {"action": "batch", "steps": []},  # Nested batches are dropped
+        ]})
+        self.assertEqual(feedback["status"], "success")
+        self.assertEqual([result["action"] for result in feedback["details"]["results"]], ["read_file", "read_file"])
+        self.assertEqual(self.agent_state["last_read_content"], "--- a.txt ---\nA\n\n--- b.txt ---\nB")
+
+    def test_batch_reports_failed_steps(self):
+        feedback = self.executor.execute_action({"action": "batch", "steps": [{"action": "read_file", "file": "missing.txt"}]})
+        self.assertEqual(feedback["status"], "failure")
+
+    def test_back_to_back_actions_enumerate_windows_once(self):
+        enumerations = []
+        self.executor.system_interaction = FakeSystemInteraction()
+        self.executor._windows_cache = _CachedEnum(lambda: enumerations.append(1) or ["Editor"], ttl=60)
+        first = self.executor.execute_action({"action": "type_text", "text": "hello"})
+        second = self.executor.execute_action({"action": "focus_window", "title_substring": "Editor"})
+        self.assertEqual(first["details"]["open_windows"], ["Editor"])
+        self.assertEqual(second["details"]["open_windows"], ["Editor"])
+        self.assertEqual(len(enumerations), 1)
+
+    def test_batch_shell_runs_every_command(self):
+        feedback = self.executor.execute_action({"action": "batch_shell", "inputs": [
+            {"command": [sys.executable, "-c", "print('one')"]},
+            {"command": [sys.executable, "-c", "import sys; sys.exit(3)"], "ignore_errors": True},
+        ]})
+        self.assertEqual(feedback["status"], "success")
+        results = feedback["details"]["results"]
+        self.assertEqual([result["return_code"] for result in results], [0, 3])
+        self.assertEqual(results[0]["stdout"], "one")
+        self.assertEqual(feedback["details"]["open_windows"], ["Editor"])
+        self.assertEqual(feedback["details"]["processes"], ["python"])
+
+    def test_batch_shell_runs_commands_concurrently_with_timeouts(self):
+        sleep = [sys.executable, "-c", "import time; time.sleep(1)"]
+        start = time.monotonic()
+        feedback = self.executor.execute_action({"action": "batch_shell", "inputs": [
+            {"command": sleep}, {"command": sleep}, {"command": sleep},
+            {"command": [sys.executable, "-c", "import time; time.sleep(30)"], "timeout": 0.5},
+        ]})
+        self.assertLess(time.monotonic() - start, 10)
+        self.assertEqual([result["return_code"] for result in feedback["details"]["results"]], [0, 0, 0, 1])
+        self.assertIn("timed out", feedback["details"]["results"][3]["stderr"])
+
+    def test_batch_shell_fails_on_unignored_error(self):
+        feedback = self.executor.execute_action({"action": "batch_shell", "inputs": [
+            {"command": [sys.executable, "-c", "import sys; sys.exit(1)"]},
+        ]})
+        self.assertEqual(feedback["status"], "failure")
+
+if __name__ == "__main__":
+    unittest.main()
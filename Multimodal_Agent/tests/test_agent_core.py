@@ -3,9 +3,13 @@ Basic smoke tests for AgentCore.
 """
 import sys
 import os
+import json
+import tempfile
+import threading
 import unittest
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), 'agent_ai')))
-from agent_ai.core.agent_core import AgentCore
+from agent_ai.core.agent_core import AgentCore, _StreamedPlan
+from agent_ai.core.llm.response import LLMResponse
 
 class MockLLMClient:
     def generate_content(self, contents, generation_config):
@@ -13,6 +17,70 @@ class MockLLMClient:
             text = '{"action": "task_complete"}'
         return Response()
 
+class ScriptedLLMClient:
+    """Answers planning, action and reflection prompts from fixed scripts and records every prompt."""
+    def __init__(self, plan, actions, reflection_status="success"):
+        self.plan = plan
+        self.actions = actions  # Plan step description -> action object
+        self.reflection_status = reflection_status
+        self.prompts = []
+        self.lock = threading.Lock()
+
+    def generate_content(self, contents, generation_config):
+        prompt = "".join(part for part in contents if isinstance(part, str))
+        with self.lock:
+            self.prompts.append(prompt)
+        if "planning phase" in prompt:
+            text = json.dumps({"plan": self.plan})
+        elif "Reflecting on the last action" in prompt:
+            text = json.dumps({"status": self.reflection_status, "thought": "checked"})
+        elif "Current Plan Step" in prompt:
+            step = prompt.split("Current Plan Step")[1]
+            description = step.split("Description:")[1].split("\n")[0].strip()
+            text = json.dumps(self.actions.get(description, {"action": "task_complete"}))
+        else:
+            text = json.dumps({"score": 10})
+        return LLMResponse(text=text)
+
+    def reflections(self):
+        return [p for p in self.prompts if "Reflecting on the last action" in p]
+
+class SubtaskPlanningLLMClient:
+    """Plans only the first subtask in the batched call; individual planning calls must overlap to get past the barrier."""
+    def __init__(self, concurrent_calls):
+        self.barrier = threading.Barrier(concurrent_calls, timeout=10)
+
+    def generate_content(self, contents, generation_config):
+        prompt = "".join(part for part in contents if isinstance(part, str))
+        if "Subtasks (id. description)" in prompt:
+            text = json.dumps({"plans": [{"id": 0, "plan": [{"action": "wait", "description": "batched"}]}]})
+        else:
+            self.barrier.wait()
+            task = prompt.split('Task: "')[1].split('"')[0]
+            text = json.dumps({"plan": [{"action": "wait", "description": task}]})
+        return LLMResponse(text=text)
+
+class BrokenStreamLLMClient:
+    """Streams the start of a plan, then loses the connection."""
+    def generate_content(self, contents, generation_config, stream=False):
+        yield LLMResponse(text='{"plan": [{"action": "read_file", "file": "a.txt", "description": "read"}, ')
+        raise ConnectionError("reset")
+
+class StreamedPlanTest(unittest.TestCase):
+    """Unit tests for the _StreamedPlan helper."""
+    def test_wait_for_blocks_until_step_arrives(self):
+        plan = _StreamedPlan()
+        threading.Timer(0.05, plan.add, args=({"action": "wait"},)).start()
+        self.assertTrue(plan.wait_for(0))
+        self.assertEqual(plan.steps, [{"action": "wait"}])
+
+    def test_wait_for_returns_false_once_plan_is_complete(self):
+        plan = _StreamedPlan()
+        plan.add({"action": "wait"})
+        threading.Timer(0.05, plan.finish).start()
+        self.assertFalse(plan.wait_for(1))
+        self.assertTrue(plan.done)
+
 class AgentCoreTest(unittest.TestCase):
     """Unit tests for AgentCore class."""
     def test_agent_init(self):
@@ -24,5 +92,47 @@ class AgentCoreTest(unittest.TestCase):
         agent.run_agent("Test task")
         self.assertEqual(agent.agent_state["status"], "completed")
 
+    def test_failed_web_search_is_reflected_on(self):
+        client = ScriptedLLMClient(
+            plan=[{"action": "web_search", "query": "x", "description": "search"}, {"action": "task_complete", "description": "done"}],
+            actions={"search": {"action": "web_search", "query": "x"}},
+        )
+        agent = AgentCore(llm_client=client)
+        agent.action_executor.web_search_tool = lambda query, num_results, deep=False: "Web search failed: offline"
+        agent.run_agent("Search the web")
+        self.assertTrue(any("web_search" in p.split("Action result")[0] for p in client.reflections()))
+
+    def test_step_depending_on_earlier_output_is_not_batched(self):
+        with tempfile.TemporaryDirectory() as directory:
+            name = "found_" + os.path.basename(directory) + ".txt"  # Unique, so no saved state from earlier runs mentions it
+            path = os.path.join(directory, name)
+            with open(path, "w") as f:
+                f.write("content")
+            client = ScriptedLLMClient(
+                plan=[
+                    {"action": "list_directory", "path": directory, "description": "list"},
+                    {"action": "read_file", "description": "read the file found"},
+                    {"action": "task_complete", "description": "done"},
+                ],
+                actions={"list": {"action": "list_directory", "path": directory}, "read the file found": {"action": "read_file", "file": path}},
+            )
+            agent = AgentCore(llm_client=client)
+            agent.run_agent("Read the file in the directory")
+        read_prompts = [p for p in client.prompts if "Description: read the file found" in p]
+        self.assertTrue(read_prompts)
+        # The read step's action was requested only after the listing ran
+        self.assertTrue(all(name in p.split("Last Directory List:")[1] for p in read_prompts))
+
+    def test_plan_stream_failure_does_not_add_error_step(self):
+        agent = AgentCore(llm_client=BrokenStreamLLMClient())
+        plan = agent._start_plan_stream("Read a file", "")
+        self.assertFalse(plan.wait_for(1))
+        self.assertEqual(plan.steps, [{"action": "read_file", "file": "a.txt", "description": "read"}])
+
+    def test_subtasks_missing_from_batched_plan_are_planned_concurrently(self):
+        agent = AgentCore(llm_client=SubtaskPlanningLLMClient(concurrent_calls=2), llm_max_concurrency=2)
+        plans = agent._plan_tasks_batch(["first", "second", "third"], "")
+        self.assertEqual([plan[0]["description"] for plan in plans], ["batched", "second", "third"])
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,99 @@
+import unittest
+import os
+import sys
+import threading
+import time
+import tempfile
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), 'agent_ai')))
+from agent_ai.action.feedback_handler import FeedbackHandler
+
+class FeedbackHandlerTest(unittest.TestCase):
+    """Unit tests for FeedbackHandler class."""
+    def setUp(self):
+        self.handler = FeedbackHandler()
+
+    def test_fifo_order(self):
+        self.handler.receive_feedback("first")
+        self.handler.receive_feedback("second")
+        self.assertEqual(self.handler.get_latest_feedback(), "first")
+        self.assertEqual(self.handler.get_all_feedback(), ["second"])
+        self.assertIsNone(self.handler.get_latest_feedback())
+
+    def test_receive_feedback_many(self):
+        self.handler.receive_feedback("a")
+        self.handler.receive_feedback_many(["b", "c"])
+        self.assertEqual(self.handler.get_all_feedback(), ["a", "b", "c"])
+
+    def test_queue_is_bounded(self):
+        handler = FeedbackHandler(max_pending=2)
+        handler.receive_feedback("a")
+        handler.receive_feedback("b")
+        handler.receive_feedback("c")
+        handler.receive_feedback_many(["d"])
+        self.assertEqual(handler.get_all_feedback(), ["c", "d"])
+
+    def test_concurrent_producer_consumer(self):
+        count = 2000
+        # Large enough that nothing is dropped, so every item must arrive in order
+        handler = FeedbackHandler(max_pending=count)
+        available = threading.Semaphore(0)
+        received = []
+
+        def produce():
+            for i in range(count):
+                handler.receive_feedback(str(i))
+                available.release()
+
+        producer = threading.Thread(target=produce, daemon=True)
+        producer.start()
+        deadline = time.monotonic() + 10
+        while len(received) < count:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not available.acquire(timeout=remaining):
+                self.fail(f"Timed out after receiving {len(received)} of {count} items")
+            received.append(handler.get_latest_feedback())
+        producer.join(timeout=10)
+        self.assertEqual(received, [str(i) for i in range(count)])
+
+class AskUserForInputTest(unittest.TestCase):
+    """Answers are written the way the web backend (rename) or a plain editor (in place) would write them."""
+    root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    answer_path = os.path.join(root, 'pending_answer.txt')
+    question_path = os.path.join(root, 'pending_question.txt')
+
+    def tearDown(self):
+        for path in (self.answer_path, self.question_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def answer_later(self, write):
+        def run():
+            while not os.path.exists(self.question_path):
+                time.sleep(0.01)
+            write()
+        threading.Thread(target=run, daemon=True).start()
+
+    def write_in_place(self, text):
+        with open(self.answer_path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+    def write_and_rename(self, text):
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, self.answer_path)
+
+    def test_answer_written_in_place(self):
+        self.answer_later(lambda: self.write_in_place("blue"))
+        self.assertEqual(FeedbackHandler().ask_user_for_input("Colour?", timeout=10), "blue")
+        self.assertFalse(os.path.exists(self.answer_path))
+
+    def test_empty_answer_returns_without_waiting_for_timeout(self):
+        self.answer_later(lambda: self.write_and_rename(""))
+        start = time.monotonic()
+        self.assertEqual(FeedbackHandler().ask_user_for_input("Colour?", timeout=10), "")
+        self.assertLess(time.monotonic() - start, 5)
+        self.assertFalse(os.path.exists(self.answer_path))
+
+if __name__ == "__main__":
+    unittest.main()
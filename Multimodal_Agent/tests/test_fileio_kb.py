@@ -1,6 +1,7 @@
 import unittest
 import os
 import sys
+from unittest import mock
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), 'agent_ai')))
 from agent_ai.perception.file_io import FileIO
 from agent_ai.memory.knowledge_base import KnowledgeBase
@@ -56,5 +57,22 @@ class KnowledgeBaseTest(unittest.TestCase):
         loaded = self.kb.load_agent_state()
         self.assertEqual(loaded, state)
 
+    def test_new_history_is_appended_to_journal(self):
+        self.assertTrue(self.kb.store_agent_state({"status": "idle", "history": [{"step": 1}]}))
+        state = {"status": "running", "history": [{"step": 1}, {"step": 2}]}
+        self.assertTrue(self.kb.store_agent_state(state, new_history=[{"step": 2}]))
+        loaded = self.kb.load_agent_state()
+        self.assertEqual(loaded["status"], "running")
+        self.assertEqual(loaded["history"], [{"step": 1}, {"step": 2}])
+        self.assertIn("history", state)  # The caller's state is left untouched
+
+    def test_history_journal_is_bounded(self):
+        self.assertTrue(self.kb.store_agent_state({"history": []}))
+        with mock.patch("agent_ai.memory.knowledge_base.HISTORY_MAX", 3):
+            for step in range(5):
+                self.assertTrue(self.kb.store_agent_state({}, new_history=[{"step": step}]))
+            loaded = self.kb.load_agent_state()
+        self.assertEqual(loaded["history"], [{"step": 2}, {"step": 3}, {"step": 4}])
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,157 @@
+import unittest
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), 'agent_ai')))
+from agent_ai.core.llm_interface import LLMInterface, iter_plan_steps, first_json_object, extract_first_action
+from agent_ai.core.llm.cache import LLMResponseCache
+from agent_ai.core.llm.response import LLMResponse
+from agent_ai.utils.logger import Logger
+
+class _Chunk:
+    def __init__(self, text):
+        self._text = text
+
+    @property
+    def text(self):
+        if self._text is None:
+            raise ValueError("The response has no parts.")
+        return self._text
+
+class StreamingLLMClient:
+    def __init__(self, texts, error=None):
+        self.texts = texts
+        self.error = error  # Raised once every text has been streamed
+
+    def generate_content(self, contents, generation_config, stream=False):
+        for text in self.texts:
+            yield _Chunk(text)
+        if self.error is not None:
+            raise self.error
+
+class EchoLLMClient:
+    """Answers every prompt with itself after a short delay and tracks how many calls overlap."""
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    def generate_content(self, contents, generation_config):
+        with self.lock:
+            self.calls += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(self.delay)
+        with self.lock:
+            self.in_flight -= 1
+        return LLMResponse(text="".join(part for part in contents if isinstance(part, str)))
+
+class PlanParsingTest(unittest.TestCase):
+    """Unit tests for the incremental response parsing helpers."""
+    def test_iter_plan_steps_yields_each_step_as_it_completes(self):
+        response = '{"plan": [{"action": "read_file", "file": "a}.txt"}, {"action": "task_complete", "nested": {"x": [1]}}], "extra": 1}'
+        chunks = [response[i:i + 7] for i in range(0, len(response), 7)]
+        seen = []
+        def stream():
+            for chunk in chunks:
+                seen.append(chunk)
+                yield chunk
+        steps = iter_plan_steps(stream())
+        first = next(steps)
+        self.assertEqual(first, {"action": "read_file", "file": "a}.txt"})
+        # The first step was yielded before the rest of the response arrived
+        self.assertLess(len(seen), len(chunks))
+        self.assertEqual(list(steps), [{"action": "task_complete", "nested": {"x": [1]}}])
+
+    def test_iter_plan_steps_without_plan_yields_nothing(self):
+        self.assertEqual(list(iter_plan_steps(['{"action": "wait"}'])), [])
+
+    def test_first_json_object_ignores_surrounding_text(self):
+        self.assertEqual(first_json_object('Sure:\n```json\n{"action": "wait"}\n```'), {"action": "wait"})
+        self.assertEqual(first_json_object('{"a": 1} trailing {"b": 2}'), {"a": 1})
+        self.assertEqual(first_json_object('{broken {"a": 1}'), {"a": 1})
+        with self.assertRaises(json.JSONDecodeError):
+            first_json_object("no object here")
+
+    def test_extract_first_action_waits_for_a_complete_object(self):
+        self.assertIsNone(extract_first_action('{"first_action": {"action": "read_'))
+        self.assertEqual(extract_first_action('{"first_action": {"action": "wait"}, "plan": ['), {"action": "wait"})
+
+class LLMResponseCacheTest(unittest.TestCase):
+    """Unit tests for LLMResponseCache class."""
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = LLMResponseCache(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_put_and_get(self):
+        key = self.cache.key("prompt", b"image", 0.0)
+        self.assertIsNone(self.cache.get(key))
+        self.cache.put(key, "response")
+        self.assertEqual(self.cache.get(key), "response")
+        self.assertEqual(self.cache.stats, {"hits": 1, "misses": 1})
+
+    def test_key_covers_image_and_temperature(self):
+        keys = {self.cache.key("prompt", None, 0.0), self.cache.key("prompt", b"image", 0.0), self.cache.key("prompt", None, 0.5)}
+        self.assertEqual(len(keys), 3)
+
+    def test_expired_and_other_version_entries_miss(self):
+        key = self.cache.key("prompt", None, 0.0)
+        LLMResponseCache(self.tmp.name, ttl=-1).put(key, "expired")
+        self.assertIsNone(self.cache.get(key))
+        LLMResponseCache(self.tmp.name, prompt_version=self.cache.prompt_version + 1).put(key, "other version")
+        self.assertIsNone(self.cache.get(key))
+
+class LLMInterfaceTest(unittest.TestCase):
+    """Unit tests for LLMInterface class."""
+    def make_interface(self, client, **kwargs):
+        return LLMInterface(client, Logger(), max_calls_per_minute=0, **kwargs)
+
+    def test_stream_skips_chunks_without_parts(self):
+        llm = self.make_interface(StreamingLLMClient(['{"action": ', None, '"wait"}', None]))
+        self.assertEqual("".join(llm.stream_llm("prompt")), '{"action": "wait"}')
+
+    def test_stream_failure_before_any_text_yields_error_response(self):
+        llm = self.make_interface(StreamingLLMClient([], error=ConnectionError("reset")))
+        self.assertEqual(json.loads("".join(llm.stream_llm("prompt")))["action"], "unknown")
+
+    def test_stream_failure_midway_raises(self):
+        llm = self.make_interface(StreamingLLMClient(['{"plan": [{"action": "wait"}, '], error=ConnectionError("reset")))
+        steps = []
+        with self.assertRaises(ConnectionError):
+            for step in iter_plan_steps(llm.stream_llm("prompt")):
+                steps.append(step)
+        self.assertEqual(steps, [{"action": "wait"}])
+
+    def test_acall_llm_many_keeps_prompt_order(self):
+        client = EchoLLMClient()
+        llm = self.make_interface(client, max_concurrency=3)
+        prompts = [f"prompt {i}" for i in range(6)]
+        self.assertEqual(asyncio.run(llm.acall_llm_many(prompts)), prompts)
+        self.assertGreater(client.max_in_flight, 1)
+        self.assertLessEqual(client.max_in_flight, 3)
+
+    def test_acall_llm_many_respects_concurrency_cap(self):
+        client = EchoLLMClient()
+        llm = self.make_interface(client, max_concurrency=1)
+        asyncio.run(llm.acall_llm_many(["a", "b", "c"]))
+        self.assertEqual(client.max_in_flight, 1)
+
+    def test_cached_response_skips_the_client(self):
+        client = EchoLLMClient(delay=0)
+        with tempfile.TemporaryDirectory() as directory:
+            llm = self.make_interface(client, cache=LLMResponseCache(directory))
+            self.assertEqual(llm.call_llm("prompt"), "prompt")
+            self.assertEqual(llm.call_llm("prompt"), "prompt")
+        self.assertEqual(client.calls, 1)
+
+if __name__ == "__main__":
+    unittest.main()
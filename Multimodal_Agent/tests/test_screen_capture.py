@@ -0,0 +1,18 @@
+import unittest
+import os
+import sys
+from unittest import mock
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), 'agent_ai')))
+from agent_ai.perception.screen_capture import ScreenCapture
+
+class ScreenCaptureTest(unittest.TestCase):
+    """Unit tests for ScreenCapture class."""
+    def test_unavailable_pyautogui_is_reported_not_raised(self):
+        capture = ScreenCapture()
+        for error in (ImportError("No module named 'pyautogui'"), KeyError("DISPLAY")):
+            with mock.patch("agent_ai.perception.screen_capture._pg", side_effect=error):
+                self.assertIsNone(capture.capture_screen_bytes())
+                self.assertIsNone(capture.capture_region_bytes(0, 0, 10, 10))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+import unittest
+import asyncio
+import os
+import signal
+import sys
+import tempfile
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), 'agent_ai')))
+from agent_ai.action.system_interaction import SystemInteraction
+
+def _is_running(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    return True
+
+class SystemInteractionTest(unittest.TestCase):
+    """Unit tests for SystemInteraction shell commands."""
+    def setUp(self):
+        self.system = SystemInteraction()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.pid_file = os.path.join(self.tmp.name, "child.pid")
+        # Records its PID, then outlives any test
+        self.sleep_command = [sys.executable, "-c", f"import os, time; open({self.pid_file!r}, 'w').write(str(os.getpid())); time.sleep(30)"]
+
+    def tearDown(self):
+        pid = self.child_pid()
+        if pid and os.name != "nt" and _is_running(pid):
+            os.kill(pid, signal.SIGKILL)
+        self.tmp.cleanup()
+
+    def child_pid(self) -> int | None:
+        try:
+            with open(self.pid_file, encoding="utf-8") as f:
+                return int(f.read())
+        except (OSError, ValueError):
+            return None
+
+    async def wait_for_child(self):
+        while self.child_pid() is None:
+            await asyncio.sleep(0.05)
+
+    def test_async_command_uses_cwd(self):
+        command = [sys.executable, "-c", "import os; print(os.getcwd())"]
+        return_code, stdout, _ = asyncio.run(self.system.execute_shell_command_async(command, cwd=self.tmp.name))
+        self.assertEqual(return_code, 0)
+        self.assertEqual(os.path.realpath(stdout.strip()), os.path.realpath(self.tmp.name))
+
+    @unittest.skipIf(os.name == "nt", "checks the child PID with POSIX signals")
+    def test_async_command_timeout_kills_child(self):
+        return_code, _, stderr = asyncio.run(self.system.execute_shell_command_async(self.sleep_command, timeout=2))
+        self.assertEqual(return_code, 1)
+        self.assertIn("timed out", stderr)
+        self.assertFalse(_is_running(self.child_pid()))
+
+    @unittest.skipIf(os.name == "nt", "checks the child PID with POSIX signals")
+    def test_cancelled_async_command_kills_child(self):
+        async def run():
+            task = asyncio.create_task(self.system.execute_shell_command_async(self.sleep_command))
+            await asyncio.wait_for(self.wait_for_child(), 10)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+        asyncio.run(run())
+        self.assertFalse(_is_running(self.child_pid()))
+
+if __name__ == "__main__":
+    unittest.main()
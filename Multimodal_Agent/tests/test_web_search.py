@@ -0,0 +1,105 @@
+import unittest
+import importlib
+import os
+import sys
+from unittest import mock
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), 'agent_ai')))
+web_search_module = importlib.import_module("agent_ai.action.web_search")
+
+SEARCH_URL = "https://www.googleapis.com/customsearch/v1"
+PAGE_URL = "https://example.com/page"
+
+class FakeResponse:
+    def __init__(self, status_code=200, json_data=None, text="", headers=None):
+        self.status_code = status_code
+        self.json_data = json_data
+        self.text = text
+        self.headers = headers or {}
+        self.encoding = "utf-8"
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(f"HTTP {self.status_code}")
+
+    def json(self):
+        return self.json_data
+
+    def iter_content(self, chunk_size, decode_unicode=False):
+        yield self.text
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+class FakeWeb:
+    """Serves the CSE API and one result page, honouring If-None-Match, and records every request."""
+    def __init__(self, snippet):
+        self.snippet = snippet
+        self.requests = []
+
+    def get(self, url, params=None, headers=None, **kwargs):
+        self.requests.append((url, dict(headers or {})))
+        if url == SEARCH_URL:
+            return FakeResponse(json_data={"items": [{"link": PAGE_URL, "snippet": self.snippet}]})
+        if (headers or {}).get("If-None-Match") == '"v1"':
+            return FakeResponse(status_code=304)
+        return FakeResponse(text="Page text", headers={"ETag": '"v1"'})
+
+    def urls(self):
+        return [url for url, _ in self.requests]
+
+@mock.patch.dict(os.environ, {"GOOGLE_CSE_API_KEY": "key", "GOOGLE_CSE_ID": "cse"})
+class WebSearchTest(unittest.TestCase):
+    """Unit tests for the web_search tool, with the network replaced by FakeWeb."""
+    def setUp(self):
+        web_search_module._CACHE.clear()
+        web_search_module._PAGE_CACHE.clear()
+        # Parsing is not under test; the fake page is already plain text
+        patcher = mock.patch.object(web_search_module, "_extract_text", lambda html: html)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def use(self, web):
+        patcher = mock.patch.object(web_search_module._SESSION, "get", web.get)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return web
+
+    def test_long_snippets_skip_the_page_fetch(self):
+        snippet = "Informative snippet. " * 20
+        web = self.use(FakeWeb(snippet))
+        self.assertEqual(web_search_module.web_search("query"), snippet.strip())
+        self.assertEqual(web.urls(), [SEARCH_URL])
+
+    def test_repeated_query_is_served_from_cache(self):
+        web = self.use(FakeWeb("short"))
+        first = web_search_module.web_search("query")
+        second = web_search_module.web_search("query")
+        self.assertEqual(first, "Page text")
+        self.assertEqual(second, first)
+        self.assertEqual(web.urls(), [SEARCH_URL, PAGE_URL])
+
+    def test_page_is_revalidated_with_etag(self):
+        web = self.use(FakeWeb("short"))
+        self.assertEqual(web_search_module.web_search("query", deep=True), "Page text")
+        web_search_module._CACHE.clear()  # Force a new search; only the page validators remain
+        self.assertEqual(web_search_module.web_search("query", deep=True), "Page text")
+        page_requests = [headers for url, headers in web.requests if url == PAGE_URL]
+        self.assertEqual(page_requests[1].get("If-None-Match"), '"v1"')
+
+    def test_unreadable_pages_are_not_cached(self):
+        web = self.use(FakeWeb("short"))
+        with mock.patch.object(web_search_module, "_extract_text", lambda html: ""):
+            self.assertEqual(web_search_module.web_search("query"), "No readable content found.")
+        self.assertEqual(web_search_module.web_search("query"), "Page text")
+        self.assertEqual(web.urls().count(SEARCH_URL), 2)
+
+    def test_failures_are_reported_as_failed_results(self):
+        with mock.patch.dict(os.environ, {"GOOGLE_CSE_API_KEY": ""}):
+            self.assertTrue(web_search_module.is_failed_result(web_search_module.web_search("query")))
+        self.assertFalse(web_search_module.is_failed_result("Page text"))
+
+if __name__ == "__main__":
+    unittest.main()
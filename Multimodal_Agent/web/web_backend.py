@@ -8,6 +8,7 @@ from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 import threading
 from agent_ai.core.agent_core import AgentCore
+from agent_ai.utils.history import bounded_history
 import google.generativeai as genai
 import logging
 
@@ -122,9 +123,11 @@ def get_pending_question():
 def post_pending_answer(req: Request):
     data = req.json() if hasattr(req, 'json') else req
     answer = data.get("answer", "").strip()
-    # Save answer for agent to pick up
-    with open(pending_answer_path, "w", encoding="utf-8") as f:
+    # Save answer for agent to pick up; written aside and renamed in so the agent never reads a partial file
+    tmp_path = pending_answer_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
         f.write(answer)
+    os.replace(tmp_path, pending_answer_path)
     # Remove the pending question
     if os.path.exists(pending_question_path):
         os.remove(pending_question_path)
@@ -143,10 +146,10 @@ def reset_agent():
     agent.agent_state = agent.knowledge_base.load_agent_state() or {
         "status": "idle",
         "current_task": "None",
-        "history": [],
         "current_plan": [],
         "plan_step": 0
     }
+    agent.agent_state["history"] = bounded_history(agent.agent_state.get("history", []))
     agent.agent_state["status"] = "idle"  # Ensure status is idle after reset
     return {"status": "reset"}
 
@@ -163,10 +166,10 @@ def kill_switch():
     agent.agent_state = agent.knowledge_base.load_agent_state() or {
         "status": "idle",
         "current_task": "None",
-        "history": [],
         "current_plan": [],
         "plan_step": 0
     }
+    agent.agent_state["history"] = bounded_history(agent.agent_state.get("history", []))
     agent.agent_state["status"] = "idle"  # Ensure status is idle after kill
     # Clear logs
     log_path = os.path.join(os.path.dirname(__file__), "..", "agent_ai", "logs", "agent.log")